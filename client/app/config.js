@@ -27,6 +27,11 @@ export const PRICING_CONFIG = {
           value: "characteristicFunction",
           desc: "(Very Fast, Exact in Fourier Space)",
         },
+        {
+          name: "Heston Carr-Madan FFT",
+          value: "fft",
+          desc: "(Fast, Prices Whole Strike Chains)",
+        },
         {
           name: "Monte Carlo Simulation",
           value: "monteCarlo",
@@ -0,0 +1,124 @@
+"""
+Synthetic option chains in the FixtureProvider layout (see
+utils/market_data.py), for benchmarks and offline runs.
+
+Quotes are Heston prices for fixed parameters with a fixed bid/ask spread,
+so a chain written today has the same maturities, strikes and prices as
+one written on any other day: expirations are placed a fixed number of
+days after `as_of`.
+
+    python -m benchmarks.fixtures --root fixtures [--symbol BENCH]
+"""
+
+import argparse
+import json
+import os
+from datetime import date, timedelta
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from models.black_scholes import BlackScholes
+from utils.calibrateHeston import heston_call_prices_vectorized
+
+FIXTURE_SYMBOL = "BENCH"
+FIXTURE_SPOT = 100.0
+FIXTURE_RATE = 0.03
+FIXTURE_PARAMS = dict(kappa=1.5, theta=0.05, xi=0.4, rho=-0.6, v0=0.03)
+FIXTURE_EXPIRY_DAYS = (21, 49, 77, 112, 175, 273, 364, 546)
+FIXTURE_STRIKES = np.arange(60.0, 142.5, 2.5)
+FIXTURE_HALF_SPREAD = 0.01  # Relative to the mid, at least one cent
+
+
+def chain_frame(
+    option_type: str, strikes, T: float, spot: float, r: float, params: Dict
+) -> pd.DataFrame:
+    """One expiry's calls or puts with yfinance option_chain columns"""
+    calls = heston_call_prices_vectorized(
+        spot,
+        strikes,
+        T,
+        r,
+        params["kappa"],
+        params["rho"],
+        params["xi"],
+        params["theta"],
+        params["v0"],
+        0.0,
+    )
+    if option_type == "call":
+        mid = calls
+        in_the_money = strikes < spot
+    else:
+        mid = calls - spot + strikes * np.exp(-r * T)
+        in_the_money = strikes > spot
+    half_spread = np.maximum(FIXTURE_HALF_SPREAD * mid, 0.01)
+    iv = BlackScholes.implied_volatility_batch(option_type, mid, spot, strikes, T, r)
+
+    # Fixed pseudo-liquidity, highest at the money
+    activity = np.rint(1000 * np.exp(-(((strikes / spot) - 1) ** 2) / 0.02))
+    return pd.DataFrame(
+        {
+            "strike": strikes,
+            "lastPrice": np.round(mid, 4),
+            "bid": np.round(np.maximum(mid - half_spread, 0.0), 4),
+            "ask": np.round(mid + half_spread, 4),
+            "volume": activity,
+            "openInterest": 10 * activity,
+            "impliedVolatility": iv["implied_volatility"],
+            "inTheMoney": in_the_money,
+        }
+    )
+
+
+def write_option_chain(
+    root: str,
+    symbol: str = FIXTURE_SYMBOL,
+    spot: float = FIXTURE_SPOT,
+    r: float = FIXTURE_RATE,
+    params: Optional[Dict] = None,
+    expiry_days: Sequence[int] = FIXTURE_EXPIRY_DAYS,
+    strikes=FIXTURE_STRIKES,
+    as_of: Optional[date] = None,
+) -> Dict:
+    """
+    Write quote.json and the per-expiry call/put CSVs for `symbol` under
+    `root`. Returns the quote (spot and expirations).
+    """
+    params = params or FIXTURE_PARAMS
+    as_of = as_of or date.today()
+    strikes = np.asarray(strikes, dtype=float)
+    directory = os.path.join(root, symbol.upper())
+    os.makedirs(directory, exist_ok=True)
+
+    expirations = []
+    for days in expiry_days:
+        expiry = (as_of + timedelta(days=days)).isoformat()
+        expirations.append(expiry)
+        for option_type in ("call", "put"):
+            frame = chain_frame(option_type, strikes, days / 365, spot, r, params)
+            frame.insert(
+                0,
+                "contractSymbol",
+                [
+                    f"{symbol.upper()}{expiry}{option_type[0].upper()}{k:g}"
+                    for k in strikes
+                ],
+            )
+            frame.to_csv(
+                os.path.join(directory, f"{expiry}_{option_type}s.csv"), index=False
+            )
+
+    quote = {"spot": spot, "expirations": expirations}
+    with open(os.path.join(directory, "quote.json"), "w") as f:
+        json.dump(quote, f)
+    return quote
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--root", required=True, help="FixtureProvider directory")
+    parser.add_argument("--symbol", default=FIXTURE_SYMBOL)
+    args = parser.parse_args()
+    print(write_option_chain(args.root, args.symbol))
@@ -0,0 +1,449 @@
+"""
+Timing benchmarks for the pricing, Monte Carlo and calibration hot paths.
+
+Every benchmark is warmed up once and then timed over several rounds; a
+round repeats fast calls until it lasts at least MIN_ROUND_TIME. Per-call
+statistics go to a JSON file together with the commit and machine they
+were measured on, and `compare` flags benchmarks whose median time grew by
+more than the threshold (exit status 1), so two commits can be checked on
+the same machine:
+
+    python -m benchmarks.hot_paths run [--json results.json] [--rounds 5]
+                                       [--filter heston mc]
+    python -m benchmarks.hot_paths compare baseline.json results.json
+                                           [--threshold 0.1]
+    python -m benchmarks.hot_paths list
+"""
+
+import argparse
+import asyncio
+import atexit
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from benchmarks.fixtures import (
+    FIXTURE_EXPIRY_DAYS,
+    FIXTURE_RATE,
+    FIXTURE_SPOT,
+    FIXTURE_SYMBOL,
+    write_option_chain,
+)
+from models.black_scholes import BlackScholes
+from models.heston import Heston
+from utils.calibrateHeston import calibrate_heston, heston_cf_kernel
+
+MIN_ROUND_TIME = 0.05  # seconds
+DEFAULT_ROUNDS = 5
+DEFAULT_THRESHOLD = 0.10  # Relative slowdown of the median reported as a regression
+
+SPOT, RATE, SIGMA = 100.0, 0.03, 0.2
+HESTON_PARAMS = dict(kappa=2.0, theta=0.04, xi=0.5, rho=-0.7, v0=0.04)
+MC_PATHS = (10_000, 100_000, 1_000_000)
+HESTON_MC_PATHS = (10_000, 100_000)
+API_REQUESTS = 64  # Requests per round of the /price benchmarks
+API_CONCURRENCY = 8  # In flight at once, capped by the CPU pool backlog
+
+# name -> (setup, operations per call); setup() returns the callable to time
+BENCHMARKS = {}
+
+
+def benchmark(name: str, ops: int = 1):
+    def register(setup):
+        BENCHMARKS[name] = (setup, ops)
+        return setup
+
+    return register
+
+
+def _chain(n_strikes: int, maturities=(0.1, 0.25, 0.5, 1.0, 2.0)):
+    K = np.tile(np.linspace(70, 130, n_strikes), len(maturities))
+    T = np.repeat(maturities, n_strikes)
+    return K, T
+
+
+# --- Black-Scholes closed form ---
+
+
+@benchmark("bs_closed_form_scalar")
+def bs_closed_form_scalar():
+    return lambda: BlackScholes.closed_form("call", SPOT, 105.0, 0.5, RATE, SIGMA)
+
+
+@benchmark("bs_closed_form_batch_10k", ops=10_000)
+def bs_closed_form_batch():
+    rng = np.random.default_rng(0)
+    K = rng.uniform(50, 150, 10_000)
+    T = rng.uniform(0.05, 2.0, 10_000)
+    option_type = rng.random(10_000) < 0.5
+    return lambda: BlackScholes.closed_form_batch(option_type, SPOT, K, T, RATE, SIGMA)
+
+
+# --- Heston characteristic function ---
+
+
+def _check_kernel_cached(run):
+    """Fail setup unless repeated calls of `run` reuse the cached CF kernel"""
+    run()
+    hits = heston_cf_kernel.cache_info().hits
+    run()
+    if heston_cf_kernel.cache_info().hits == hits:
+        raise RuntimeError("Heston CF kernel cache is not used")
+    return run
+
+
+@benchmark("heston_cf_strike")
+def heston_cf_strike():
+    # Same maturity and parameters every call: priced from the cached kernel
+    return _check_kernel_cached(
+        lambda: Heston.characteristic_function(
+            "call", SPOT, 105.0, 0.5, RATE, SIGMA, **HESTON_PARAMS
+        )
+    )
+
+
+@benchmark("heston_cf_strike_cold")
+def heston_cf_strike_cold():
+    def run():
+        heston_cf_kernel.cache_clear()
+        Heston.characteristic_function(
+            "call", SPOT, 105.0, 0.5, RATE, SIGMA, **HESTON_PARAMS
+        )
+
+    return run
+
+
+@benchmark("heston_cf_chain_200", ops=200)
+def heston_cf_chain():
+    K, T = _chain(40)
+
+    def run():
+        heston_cf_kernel.cache_clear()
+        Heston.characteristic_function_batch(
+            "call", SPOT, K, T, RATE, SIGMA, **HESTON_PARAMS
+        )
+
+    return run
+
+
+@benchmark("heston_cf_chain_40_cached", ops=40)
+def heston_cf_chain_cached():
+    # One maturity: a chain re-priced from its cached kernel
+    K, T = _chain(40, maturities=(0.5,))
+    return _check_kernel_cached(
+        lambda: Heston.characteristic_function_batch(
+            "call", SPOT, K, T, RATE, SIGMA, **HESTON_PARAMS
+        )
+    )
+
+
+@benchmark("heston_fft_chain_40", ops=40)
+def heston_fft_chain():
+    K, _ = _chain(40, maturities=(0.5,))
+    return lambda: Heston.fft_chain("call", SPOT, K, 0.5, RATE, **HESTON_PARAMS)
+
+
+# --- Monte Carlo ---
+
+
+def _bs_monte_carlo(paths):
+    return lambda: BlackScholes.monte_carlo(
+        "call", SPOT, 105.0, 0.5, RATE, SIGMA, num_simulations=paths, seed=1
+    )
+
+
+def _heston_monte_carlo(paths):
+    return lambda: Heston.monte_carlo(
+        "call",
+        SPOT,
+        105.0,
+        0.5,
+        RATE,
+        SIGMA,
+        num_simulations=paths,
+        seed=1,
+        **HESTON_PARAMS,
+    )
+
+
+for _paths in MC_PATHS:
+    benchmark(f"bs_mc_{_paths}", ops=_paths)(lambda p=_paths: _bs_monte_carlo(p))
+for _paths in HESTON_MC_PATHS:
+    benchmark(f"heston_mc_{_paths}", ops=_paths)(
+        lambda p=_paths: _heston_monte_carlo(p)
+    )
+
+
+# --- Calibration on the frozen fixture chain ---
+
+
+def _calibration(method):
+    from utils.market_data import FixtureProvider, set_provider
+
+    root = tempfile.mkdtemp(prefix="bench-chain-")
+    atexit.register(shutil.rmtree, root, ignore_errors=True)
+    quote = write_option_chain(root)
+    set_provider(FixtureProvider(root))
+    expiration = quote["expirations"][FIXTURE_EXPIRY_DAYS.index(175)]
+
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = calibrate_heston(
+                FIXTURE_SYMBOL, expiration, FIXTURE_SPOT, FIXTURE_RATE, method=method
+            )
+        if not result.get("success"):
+            raise RuntimeError(f"Calibration failed: {result.get('error')}")
+
+    return run
+
+
+@benchmark("calibrate_heston_slsqp")
+def calibrate_slsqp():
+    return _calibration("SLSQP")
+
+
+@benchmark("calibrate_heston_least_squares")
+def calibrate_least_squares():
+    return _calibration("least_squares")
+
+
+# --- /price endpoint ---
+
+
+def _api(payload):
+    """Rounds of API_REQUESTS POST /price calls, API_CONCURRENCY at a time"""
+    import httpx
+
+    from main import app
+    from utils.executors import cpu_executor
+
+    # More in flight than the pool accepts would be answered 503
+    concurrency = min(API_CONCURRENCY, cpu_executor.max_pending)
+
+    async def round_trip():
+        transport = httpx.ASGITransport(app=app)
+        limit = asyncio.Semaphore(concurrency)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench"
+        ) as client:
+
+            async def post():
+                async with limit:
+                    response = await client.post("/api/v1/price", json=payload)
+                if response.status_code != 200:
+                    raise RuntimeError(f"/price answered {response.status_code}")
+
+            await asyncio.gather(*(post() for _ in range(API_REQUESTS)))
+
+    return lambda: asyncio.run(round_trip())
+
+
+_API_BASE = {
+    "option_type": "call",
+    "underlying_price": SPOT,
+    "strike_price": 105.0,
+    "yearsToExpiration": 0.5,
+    "risk_free_rate": RATE,
+    "volatility": SIGMA,
+}
+
+
+@benchmark("api_price_bs_closed_form", ops=API_REQUESTS)
+def api_price_bs():
+    return _api(dict(_API_BASE, model_type="blackScholes", solution_type="closedForm"))
+
+
+@benchmark("api_price_heston_cf", ops=API_REQUESTS)
+def api_price_heston_cf():
+    return _api(
+        dict(
+            _API_BASE,
+            model_type="heston",
+            solution_type="characteristicFunction",
+            use_surface=False,
+            **HESTON_PARAMS,
+        )
+    )
+
+
+@benchmark("api_price_heston_mc_5000", ops=API_REQUESTS)
+def api_price_heston_mc():
+    return _api(
+        dict(
+            _API_BASE,
+            model_type="heston",
+            solution_type="monteCarlo",
+            monte_carlo_simulations=5_000,
+            seed=1,
+            **HESTON_PARAMS,
+        )
+    )
+
+
+# --- Runner ---
+
+
+def time_call(fn, rounds: int):
+    """Per-call times (seconds) of `rounds` rounds, and calls per round"""
+    fn()  # Warm-up: imports, caches, worker start-up
+    number, elapsed = 1, 0.0
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_ROUND_TIME:
+            break
+        number *= 10 if elapsed < MIN_ROUND_TIME / 10 else 2
+
+    times = [elapsed / number]
+    for _ in range(rounds - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+    return times, number
+
+
+def machine_info():
+    try:
+        commit = subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit or None,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run(rounds: int = DEFAULT_ROUNDS, filters=None):
+    results = {}
+    names = [
+        name for name in BENCHMARKS if not filters or any(f in name for f in filters)
+    ]
+    try:
+        for name in names:
+            setup, ops = BENCHMARKS[name]
+            times, number = time_call(setup(), rounds)
+            median = statistics.median(times)
+            results[name] = {
+                "median": median,
+                "min": min(times),
+                "mean": statistics.fmean(times),
+                "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+                "rounds": rounds,
+                "number": number,
+                "ops": ops,
+                "ops_per_second": ops / median,
+            }
+            print(
+                f"{name:32s} {median * 1e3:12.4f} ms"
+                f"  (min {min(times) * 1e3:.4f}, {rounds}x{number})"
+                f"  {ops / median:14,.0f} ops/s"
+            )
+    finally:
+        from utils.executors import shutdown_executors
+
+        shutdown_executors()
+    return {"machine": machine_info(), "benchmarks": results}
+
+
+def compare(baseline, current, threshold: float = DEFAULT_THRESHOLD):
+    """Rows (name, baseline median, current median, ratio, status)"""
+    rows = []
+    for name, result in current["benchmarks"].items():
+        before = baseline["benchmarks"].get(name)
+        if before is None:
+            rows.append((name, None, result["median"], None, "new"))
+            continue
+        ratio = result["median"] / before["median"]
+        if ratio > 1 + threshold:
+            status = "REGRESSION"
+        elif ratio < 1 / (1 + threshold):
+            status = "faster"
+        else:
+            status = "same"
+        rows.append((name, before["median"], result["median"], ratio, status))
+    for name in baseline["benchmarks"]:
+        if name not in current["benchmarks"]:
+            rows.append(
+                (name, baseline["benchmarks"][name]["median"], None, None, "missing")
+            )
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Time the benchmarks")
+    run_parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS)
+    run_parser.add_argument(
+        "--filter", nargs="+", help="Only benchmarks whose name contains one of these"
+    )
+    run_parser.add_argument("--json", help="Write the results to this file")
+
+    compare_parser = commands.add_parser(
+        "compare", help="Flag regressions between two result files"
+    )
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+
+    commands.add_parser("list", help="List the benchmark names")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        print("\n".join(BENCHMARKS))
+    elif args.command == "run":
+        if args.rounds < 1:
+            parser.error("--rounds must be at least 1")
+        results = run(args.rounds, args.filter)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(results, f, indent=2)
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        print(
+            f"baseline {baseline['machine'].get('commit')}"
+            f" vs current {current['machine'].get('commit')}"
+            f" (threshold {args.threshold:.0%})"
+        )
+        rows = compare(baseline, current, args.threshold)
+        for name, before, after, ratio, status in rows:
+            before_ms = "-" if before is None else f"{before * 1e3:.4f}"
+            after_ms = "-" if after is None else f"{after * 1e3:.4f}"
+            change = "" if ratio is None else f"{ratio - 1:+8.1%}"
+            print(
+                f"{name:32s} {before_ms:>12s} -> {after_ms:>12s} ms"
+                f" {change:>9s}  {status}"
+            )
+        if any(row[4] == "REGRESSION" for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,25 @@
-from fastapi import FastAPI
+import logging
+import os
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from routes import api
+from utils import metrics
+from utils.executors import ExecutorOverloaded, shutdown_executors
 
-app = FastAPI()
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"))
+
+API_PREFIX = "/api/v1"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    shutdown_executors()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -11,7 +28,24 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.include_router(api.router, prefix="/api/v1")
+app.add_middleware(metrics.RequestMetrics, prefix=API_PREFIX)
+
+app.include_router(api.router, prefix=API_PREFIX)
+
+
+@app.exception_handler(ExecutorOverloaded)
+async def overloaded_handler(request: Request, exc: ExecutorOverloaded):
+    return JSONResponse(
+        status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"}
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Stage and request histograms in the Prometheus text format"""
+    return PlainTextResponse(
+        metrics.registry.render(), media_type="text/plain; version=0.0.4"
+    )
 
 
 @app.get("/")
@@ -2,7 +2,41 @@ from datetime import datetime
 import numpy as np
 from numpy import exp, log, sqrt
 from scipy.stats import norm
+from scipy.special import ndtr
+import pandas as pd
 import time
+from typing import List, Optional
+
+from models.monte_carlo import (
+    GREEK_BUMP,
+    GREEK_METHODS,
+    MomentAccumulator,
+    chunk_limit,
+    estimate,
+    greek_fields,
+    spot_bump_greeks,
+)
+from models.path_engine import make_payoff, price_payoffs
+
+# Implied volatility inversion: relative accuracy in sigma, iteration cap
+# (bisection alone gains ~1 bit per iteration)
+IV_TOLERANCE = 1e-10
+IV_MAX_ITERATIONS = 60
+# Smallest time value, relative to the price, treated as information
+IV_PRICE_RESOLUTION = 1e-12
+
+
+def _normalized_otm_price(x, w):
+    """
+    Undiscounted Black price of the out-of-the-money option per unit of
+    sqrt(F K), for x = -|ln(F / K)| and total volatility w = sigma sqrt(T)
+    """
+    return np.exp(x / 2) * ndtr(x / w + w / 2) - np.exp(-x / 2) * ndtr(x / w - w / 2)
+
+
+def _normalized_vega(x, w):
+    """Derivative of _normalized_otm_price in w"""
+    return np.exp(-0.5 * ((x / w) ** 2 + w**2 / 4)) / np.sqrt(2 * np.pi)
 
 
 class BlackScholes:
@@ -69,6 +103,241 @@ class BlackScholes:
             "vega": round(vega, 4),
         }
 
+    @staticmethod
+    def closed_form_batch(option_type, S, K, T, r, sigma) -> dict:
+        """
+        Vectorized Black-Scholes closed form for whole arrays of contracts.
+
+        Every argument may be a scalar or an array; they are broadcast against
+        each other. ``option_type`` holds "call"/"put" strings (any case) or
+        booleans where True means call. Contracts with ``T <= 0`` get their
+        intrinsic value and zero Greeks, like ``closed_form``. Greeks are not
+        rounded.
+        """
+        start_time = time.perf_counter()
+
+        option_type = np.asarray(option_type)
+        if option_type.dtype.kind == "b":
+            is_call = option_type
+        else:
+            flags = np.char.lower(option_type.astype(str))
+            if not np.all((flags == "call") | (flags == "put")):
+                raise ValueError("Option type must be 'call' or 'put'")
+            is_call = flags == "call"
+
+        is_call, S, K, T, r, sigma = np.broadcast_arrays(
+            is_call,
+            np.asarray(S, dtype=float),
+            np.asarray(K, dtype=float),
+            np.asarray(T, dtype=float),
+            np.asarray(r, dtype=float),
+            np.asarray(sigma, dtype=float),
+        )
+
+        live = T > 0
+        # Guard expired contracts so they never produce NaNs or warnings
+        T_safe = np.where(live, T, 1.0)
+        sqrt_T = np.sqrt(T_safe)
+        sig_sqrt_T = sigma * sqrt_T
+
+        d1 = (np.log(S / K) + (r + 0.5 * sigma**2) * T_safe) / sig_sqrt_T
+        d2 = d1 - sig_sqrt_T
+        sign = np.where(is_call, 1.0, -1.0)
+
+        discount_K = K * np.exp(-r * T_safe)
+        pdf_d1 = np.exp(-0.5 * d1**2) / np.sqrt(2 * np.pi)
+        cdf_sd1 = ndtr(sign * d1)
+        cdf_sd2 = ndtr(sign * d2)
+
+        price = sign * (S * cdf_sd1 - discount_K * cdf_sd2)
+        delta = sign * cdf_sd1
+        gamma = pdf_d1 / (S * sig_sqrt_T)
+        theta = -S * pdf_d1 * sigma / (2 * sqrt_T) - sign * r * discount_K * cdf_sd2
+        vega = S * sqrt_T * pdf_d1 * 0.01  # Vega per 1% change in volatility
+
+        intrinsic = np.maximum(sign * (S - K), 0)
+        expired_delta = np.where(is_call & (S > K), 1.0, 0.0)
+        zero = np.zeros_like(price)
+
+        elapsed_time = time.perf_counter() - start_time
+
+        return {
+            "price": np.where(live, price, intrinsic),
+            "methodology": "Black-Scholes Closed-Form (Vectorized)",
+            "calculation_time": round(elapsed_time * 1000, 5),
+            "d1": np.where(live, d1, zero),
+            "d2": np.where(live, d2, zero),
+            "delta": np.where(live, delta, expired_delta),
+            "gamma": np.where(live, gamma, zero),
+            "theta": np.where(live, theta, zero),
+            "vega": np.where(live, vega, zero),
+        }
+
+    @staticmethod
+    def closed_form_frame(contracts: pd.DataFrame) -> pd.DataFrame:
+        """
+        Price a DataFrame of contracts with ``closed_form_batch``.
+
+        Columns follow the ``PricingRequest`` field names: option_type,
+        underlying_price, strike_price, yearsToExpiration, risk_free_rate and
+        volatility. Returns a frame of price and Greeks on the same index.
+        """
+        result = BlackScholes.closed_form_batch(
+            contracts["option_type"].values,
+            contracts["underlying_price"].values,
+            contracts["strike_price"].values,
+            contracts["yearsToExpiration"].values,
+            contracts["risk_free_rate"].values,
+            contracts["volatility"].values,
+        )
+        columns = ["price", "d1", "d2", "delta", "gamma", "theta", "vega"]
+        return pd.DataFrame({c: result[c] for c in columns}, index=contracts.index)
+
+    @staticmethod
+    def implied_volatility_batch(
+        option_type,
+        price,
+        S,
+        K,
+        T,
+        r,
+        tol: float = IV_TOLERANCE,
+        max_iter: int = IV_MAX_ITERATIONS,
+    ) -> dict:
+        """
+        Vectorized inversion of the Black-Scholes price for whole chains.
+
+        Arguments broadcast like ``closed_form_batch``. Each price is turned
+        into the undiscounted out-of-the-money option price by put-call
+        parity and normalized by sqrt(F K), leaving one equation in the total
+        volatility w = sigma sqrt(T). Starting from the Corrado-Miller
+        rational approximation, a safeguarded Newton iteration keeps a
+        bracket [lo, hi] per contract and bisects whenever a step leaves it;
+        below the inflection point w = sqrt(2 |ln(F/K)|) it works on the log
+        of the price, where deep out-of-the-money options are near-linear.
+        Converged contracts drop out of the active set.
+
+        Prices outside the no-arbitrage bounds, expired contracts and
+        entries that have not converged within `max_iter` get NaN.
+        """
+        start_time = time.perf_counter()
+
+        option_type = np.asarray(option_type)
+        if option_type.dtype.kind == "b":
+            is_call = option_type
+        else:
+            flags = np.char.lower(option_type.astype(str))
+            if not np.all((flags == "call") | (flags == "put")):
+                raise ValueError("Option type must be 'call' or 'put'")
+            is_call = flags == "call"
+
+        is_call, price, S, K, T, r = np.broadcast_arrays(
+            is_call,
+            np.asarray(price, dtype=float),
+            np.asarray(S, dtype=float),
+            np.asarray(K, dtype=float),
+            np.asarray(T, dtype=float),
+            np.asarray(r, dtype=float),
+        )
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            live = (T > 0) & (S > 0) & (K > 0) & np.isfinite(price)
+            T_safe = np.where(live, T, 1.0)
+            forward = S * np.exp(r * T_safe)
+            root_FK = np.sqrt(forward * K)
+            x = -np.abs(np.log(forward / K))
+
+            # Undiscounted price; subtracting the forward intrinsic value of
+            # an in-the-money option leaves the out-of-the-money one (parity)
+            sign = np.where(is_call, 1.0, -1.0)
+            intrinsic = np.maximum(sign * (forward - K), 0)
+            undiscounted = price * np.exp(r * T_safe)
+            target = (undiscounted - intrinsic) / root_FK
+            # A time value lost in the rounding of the price identifies no vol
+            identified = target * root_FK > IV_PRICE_RESOLUTION * undiscounted
+            solvable = live & identified & (target < np.exp(x / 2))
+
+            # Corrado-Miller on the normalized out-of-the-money call
+            half_spread = (np.exp(x / 2) - np.exp(-x / 2)) / 2
+            level = target - half_spread
+            guess = (
+                np.sqrt(2 * np.pi)
+                / (np.exp(x / 2) + np.exp(-x / 2))
+                * (
+                    level
+                    + np.sqrt(np.maximum(level**2 - 4 * half_spread**2 / np.pi, 0))
+                )
+            )
+        inflection = np.sqrt(-2 * np.where(solvable, x, 0))
+        log_objective = np.zeros(x.shape, dtype=bool)
+        log_objective[solvable] = target[solvable] < _normalized_otm_price(
+            x[solvable], np.maximum(inflection[solvable], 1e-300)
+        )
+        guess = np.where(
+            np.isfinite(guess) & (guess > 0), guess, np.maximum(inflection, 0.1)
+        )
+        # Deep out of the money, ln b ~ -x^2 / (2 w^2) often starts closer
+        wing = np.flatnonzero(log_objective)
+        if wing.size:
+            x_w, target_w = x.flat[wing], target.flat[wing]
+            wing_guess = -x_w / np.sqrt(-2 * np.log(target_w))
+            # A guess far off can overflow the ratio: an infinite miss loses
+            with np.errstate(divide="ignore", over="ignore"):
+                miss = [
+                    np.abs(np.log(_normalized_otm_price(x_w, g) / target_w))
+                    for g in (guess.flat[wing], wing_guess)
+                ]
+            guess.flat[wing] = np.where(miss[1] < miss[0], wing_guess, guess.flat[wing])
+
+        w = np.where(solvable, guess, np.nan)
+        lo = np.zeros_like(w)
+        hi = np.full_like(w, np.inf)
+        converged = np.zeros(w.shape, dtype=bool)
+        active = np.flatnonzero(solvable)
+        flat = [a.reshape(-1) for a in (w, lo, hi, x, target, log_objective)]
+        w_flat, lo_flat, hi_flat, x_flat, target_flat, log_flat = flat
+        converged_flat = converged.reshape(-1)
+
+        iterations = 0
+        while active.size and iterations < max_iter:
+            iterations += 1
+            x_a, w_a, target_a = x_flat[active], w_flat[active], target_flat[active]
+            b = _normalized_otm_price(x_a, w_a)
+            vega = _normalized_vega(x_a, w_a)
+
+            # b increases with w, so every evaluation tightens the bracket
+            below = b < target_a
+            lo_a = np.where(below, w_a, lo_flat[active])
+            hi_a = np.where(below, hi_flat[active], w_a)
+            lo_flat[active], hi_flat[active] = lo_a, hi_a
+
+            with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+                step = np.where(
+                    log_flat[active],
+                    np.log(b / target_a) * b / vega,
+                    (b - target_a) / vega,
+                )
+                w_new = w_a - step
+            done = (np.abs(step) <= tol * w_a) | (b == target_a)
+            outside = ~np.isfinite(w_new) | (w_new <= lo_a) | (w_new >= hi_a)
+            fallback = np.where(np.isfinite(hi_a), 0.5 * (lo_a + hi_a), 2 * w_a)
+            w_new = np.where(outside & ~done, fallback, w_new)
+            # A bracket narrowed to the tolerance also settles w
+            done |= hi_a - lo_a <= tol * w_new
+            w_flat[active] = w_new
+            converged_flat[active[done]] = True
+            active = active[~done]
+
+        elapsed_time = time.perf_counter() - start_time
+
+        return {
+            "implied_volatility": np.where(converged, w / np.sqrt(T_safe), np.nan),
+            "converged": converged,
+            "iterations": iterations,
+            "methodology": "Black-Scholes Implied Volatility (Vectorized Newton)",
+            "calculation_time": round(elapsed_time * 1000, 5),
+        }
+
     @staticmethod
     def monte_carlo(
         option_type: str,
@@ -78,10 +347,41 @@ class BlackScholes:
         r: float,
         sigma: float,
         num_simulations: int = 100000,
+        chunk_size: int = 500000,
+        seed: Optional[int] = None,
+        workers: Optional[int] = None,
+        sampler: str = "pseudo",
+        replications: Optional[int] = None,
+        target_stderr: Optional[float] = None,
+        max_time: Optional[float] = None,
+        greeks: Optional[str] = None,
     ) -> dict:
-        """Monte Carlo simulation with variance reduction techniques"""
-        if num_simulations <= 0:
-            raise ValueError("num_simulations must be greater than zero")
+        """
+        Monte Carlo simulation with variance reduction techniques.
+
+        With the "pseudo" sampler each of the num_simulations draws gives an
+        antithetic pair, and the draws are split across `workers` threads with
+        independent random streams spawned from `seed`; a given
+        (seed, workers) pair always reproduces the same price. The "sobol"
+        sampler uses randomized QMC (see models.monte_carlo.estimate).
+
+        Given `target_stderr`, num_simulations is only a budget: draws are
+        added in rounds until the standard error of the price reaches the
+        target, or `max_time` seconds have passed.
+
+        `greeks` also estimates delta, gamma and vega (each with its standard
+        error) on the same paths: "pathwise" differentiates the payoff along
+        each path (gamma, where the payoff has a kink, uses the pathwise
+        delta with a likelihood-ratio weight), "likelihood_ratio" weights
+        the payoff by the score of the lognormal density, and "bump" takes
+        central differences on common random numbers.
+        """
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        if option_type.lower() not in ("call", "put"):
+            raise ValueError("Option type must be 'call' or 'put'")
+        if greeks is not None and greeks not in GREEK_METHODS:
+            raise ValueError(f"greeks must be one of {GREEK_METHODS}")
 
         if T <= 0:
             return {
@@ -93,29 +393,83 @@ class BlackScholes:
 
         start_time = time.perf_counter()
 
-        # Generate random standard normal variables
-        Z = np.random.standard_normal(size=num_simulations)
-
-        # Apply antithetic variates technique to reduce variance if enabled
-        Z = np.concatenate([Z, -Z])  # Mirror the random draws
-
-        # Simulate asset prices
         drift = (r - 0.5 * sigma**2) * T
         diffusion = sigma * sqrt(T)
-        ST = S * np.exp(drift + diffusion * Z)
+        is_call = option_type.lower() == "call"
+        sign = 1.0 if is_call else -1.0
+        chunk = chunk_limit(sampler, chunk_size, 1, 1)
 
-        # Compute payoffs
-        if option_type.lower() == "call":
-            payoff = np.maximum(ST - K, 0)
-        elif option_type.lower() == "put":
-            payoff = np.maximum(K - ST, 0)
-        else:
-            raise ValueError("Option type must be 'call' or 'put'")
+        def payoff(ST):
+            return np.maximum(sign * (ST - K), 0)
+
+        def greek_columns(Z, ST, values):
+            """Per-path delta, gamma and vega samples (undiscounted)"""
+            sqrt_T = sqrt(T)
+            if greeks == "likelihood_ratio":
+                return (
+                    values * Z / (S * diffusion),
+                    values * (Z**2 - 1 - Z * diffusion) / (S * diffusion) ** 2,
+                    values * ((Z**2 - 1) / sigma - Z * sqrt_T),
+                )
+            if greeks == "bump":
+                h = GREEK_BUMP * sigma
+                ST_up = S * np.exp(
+                    (r - 0.5 * (sigma + h) ** 2) * T + (sigma + h) * sqrt_T * Z
+                )
+                ST_down = S * np.exp(
+                    (r - 0.5 * (sigma - h) ** 2) * T + (sigma - h) * sqrt_T * Z
+                )
+                delta, gamma = spot_bump_greeks(payoff, ST, S)
+                return delta, gamma, (payoff(ST_up) - payoff(ST_down)) / (2 * h)
+            # Pathwise: d payoff / dS_T is sign on the exercise region
+            slope = sign * (sign * (ST - K) > 0)
+            return (
+                slope * ST / S,
+                slope * ST / S**2 * (Z / diffusion - 1),
+                slope * ST * (sqrt_T * Z - sigma * T),
+            )
+
+        def simulate(normals, n_worker):
+            acc = MomentAccumulator()
+            for start in range(0, n_worker, chunk):
+                n_draws = min(chunk, n_worker - start)
+                # Antithetic sources mirror each draw into a pair of paths
+                n_paths = 2 * n_draws if normals.antithetic else n_draws
+                (Z,) = next(normals.steps(n_paths))
+
+                # Simulate asset prices and compute payoffs
+                ST = S * np.exp(drift + diffusion * Z)
+                values = payoff(ST)
+                if greeks is None:
+                    acc.add(values)
+                else:
+                    acc.add(values, *greek_columns(Z, ST, values))
+            return acc
+
+        if target_stderr is not None:
+            # The target applies to the price, not to the Greeks
+            target_stderr_paths = [target_stderr * np.exp(r * T)]
+            if greeks is not None:
+                target_stderr_paths += [np.inf] * 3
+
+        result = estimate(
+            simulate,
+            num_simulations,
+            sampler=sampler,
+            seed=seed,
+            workers=workers,
+            replications=replications,
+            target_stderr=None if target_stderr is None else target_stderr_paths,
+            max_time=max_time,
+            outputs=1 if greeks is None else 4,
+        )
 
         # Compute Monte Carlo estimate and standard error
-        discounted_payoff = exp(-r * T) * payoff
-        price = np.mean(discounted_payoff)
-        std_error = np.std(discounted_payoff) / sqrt(num_simulations)
+        price = float(exp(-r * T) * np.atleast_1d(result.mean)[0])
+        std_error = float(exp(-r * T) * np.atleast_1d(result.standard_error)[0])
+        greek_results = {}
+        if greeks is not None:
+            greek_results = {"greeks": greeks, **greek_fields(result, exp(-r * T))}
 
         elapsed_time = time.perf_counter() - start_time
 
@@ -130,7 +484,65 @@ class BlackScholes:
             "price": price,
             "methodology": "Monte Carlo",
             "calculation_time": round(elapsed_time * 1000, 5),
-            "num_simulations": num_simulations,
+            "num_simulations": result.num_simulations,
             "standard_error": round(std_error, 6),
             "bs_difference": round(price - bs_result["price"], 6),
+            "target_stderr": target_stderr,
+            **greek_results,
+            **result.info,
+        }
+
+    @staticmethod
+    def monte_carlo_paths(
+        payoffs: List[dict],
+        S: float,
+        T: float,
+        r: float,
+        sigma: float,
+        num_simulations: int = 100000,
+        chunk_size: int = 50000,
+        steps_per_year: int = 252,
+        **mc_options,
+    ) -> dict:
+        """
+        Price several path-dependent payoffs (see models.path_engine) on one
+        set of exact GBM paths, monitored `steps_per_year` times a year.
+        mc_options are the sampler/seed/workers/adaptive settings of
+        monte_carlo.
+        """
+        if T <= 0 or steps_per_year <= 0:
+            raise ValueError("T and steps_per_year must be positive")
+        start_time = time.perf_counter()
+
+        timesteps = max(1, int(T * steps_per_year))
+        dt = T / timesteps
+        drift = (r - 0.5 * sigma**2) * dt
+        diffusion = sigma * sqrt(dt)
+
+        def simulate(normals, n_paths, on_step):
+            S_t = np.full(n_paths, float(S))
+            for Z in normals.steps(n_paths):
+                S_t = S_t * np.exp(drift + diffusion * Z[0])
+                on_step(S_t)
+            return S_t
+
+        result = price_payoffs(
+            simulate,
+            [make_payoff(p) for p in payoffs],
+            S,
+            T,
+            r,
+            num_simulations,
+            timesteps,
+            dims=1,
+            dtype=np.float64,
+            chunk_size=chunk_size,
+            **mc_options,
+        )
+
+        elapsed_time = time.perf_counter() - start_time
+        return {
+            **result,
+            "calculation_time": round(elapsed_time * 1000, 5),
+            "methodology": "Black-Scholes Monte Carlo (Path-Dependent)",
         }
@@ -1,8 +1,30 @@
 import numpy as np
-from typing import Dict, Any
-from utils.calibrateHeston import heston_call_price, heston_put_price
+from scipy.special import ndtr
+from typing import Dict, Any, List, Optional
+from models.black_scholes import BlackScholes
+from models.monte_carlo import (
+    GREEK_BUMP,
+    MomentAccumulator,
+    RepeatedNormals,
+    chunk_limit,
+    estimate,
+    greek_fields,
+    spot_bump_greeks,
+)
+from models.path_engine import make_payoff, price_payoffs
+from utils.calibrateHeston import (
+    heston_call_prices_vectorized,
+    heston_fft_call_prices,
+    heston_put_prices_vectorized,
+)
 import time
 
+HESTON_PARAMS = ("kappa", "theta", "rho", "xi", "v0")
+CONTROL_VARIATES = ("stock", "black_scholes")
+# No closed-form transition density, so no likelihood-ratio Greeks
+GREEK_METHODS = ("pathwise", "bump")
+QE_PSI_CRITICAL = 1.5  # Andersen's switching level between QE branches
+
 
 class Heston:
 
@@ -28,91 +50,531 @@ class Heston:
         xi = heston_params.get("xi")
 
         if option_type.lower() == "call":
-            price = heston_put_price(S, K, T, r, kappa, rho, xi, theta, v0, 0)
+            price = heston_call_prices_vectorized(
+                S, K, T, r, kappa, rho, xi, theta, v0, 0
+            )
         else:
-            price = heston_put_price(S, K, T, r, kappa, rho, xi, theta, v0, 0)
+            price = heston_put_prices_vectorized(
+                S, K, T, r, kappa, rho, xi, theta, v0, 0
+            )
 
         return {
-            "price": price,
+            "price": float(price[0]),
             "methodology": "Heston Characteristic Function (Heston 1993)",
         }
 
     @staticmethod
-    def monte_carlo(
+    def characteristic_function_batch(option_type, S, K, T, r, sigma, **heston_params):
+        """
+        Vectorized Heston prices for arrays of contracts with mixed call/put
+        flags. Heston parameters may be scalars or per-contract arrays.
+        """
+        start_time = time.perf_counter()
+
+        is_call = np.char.lower(np.asarray(option_type).astype(str)) == "call"
+        args = (
+            S,
+            K,
+            T,
+            r,
+            heston_params.get("kappa"),
+            heston_params.get("rho"),
+            heston_params.get("xi"),
+            heston_params.get("theta"),
+            heston_params.get("v0"),
+            0.0,
+        )
+        calls = heston_call_prices_vectorized(*args)
+        S, K, T, r = (np.asarray(a, dtype=float) for a in (S, K, T, r))
+        puts = calls - S + K * np.exp(-r * T)
+
+        elapsed_time = time.perf_counter() - start_time
+
+        return {
+            "price": np.where(is_call, calls, puts),
+            "methodology": "Heston Characteristic Function (Vectorized Quadrature)",
+            "calculation_time": round(elapsed_time * 1000, 5),
+        }
+
+    @staticmethod
+    def fft_chain(
+        option_type: str, S: float, strikes, T: float, r: float, **heston_params
+    ):
+        """
+        Carr-Madan FFT prices for a whole strike chain at one maturity.
+        Requested strikes are interpolated off the FFT log-strike grid.
+        """
+        strikes = np.atleast_1d(np.asarray(strikes, dtype=float))
+        if T <= 0:
+            sign = 1 if option_type.lower() == "call" else -1
+            return np.maximum(sign * (S - strikes), 0.0)
+
+        calls = heston_fft_call_prices(
+            S,
+            strikes,
+            T,
+            r,
+            heston_params.get("kappa"),
+            heston_params.get("rho"),
+            heston_params.get("xi"),
+            heston_params.get("theta"),
+            heston_params.get("v0"),
+            0.0,
+        )
+        if option_type.lower() == "call":
+            return calls
+        return calls - S + strikes * np.exp(-r * T)
+
+    @staticmethod
+    def fft(
         option_type: str,
         S: float,
         K: float,
         T: float,
         r: float,
         sigma: float,
-        num_simulations: int = 100000,
         **heston_params,
-    ) -> Dict[str, Any]:
+    ) -> dict:
+        """Heston price via Carr-Madan FFT, interpolated at the requested strike"""
+        start_time = time.perf_counter()
+        price = Heston.fft_chain(option_type, S, [K], T, r, **heston_params)[0]
+        elapsed_time = time.perf_counter() - start_time
+
+        return {
+            "price": float(price),
+            "methodology": "Heston Carr-Madan FFT",
+            "calculation_time": round(elapsed_time * 1000, 5),
+        }
+
+    @staticmethod
+    def _euler_terminal(
+        normals,
+        n_paths,
+        S,
+        T,
+        r,
+        kappa,
+        theta,
+        rho,
+        volvol,
+        var0,
+        timesteps,
+        with_shocks=False,
+        on_step=None,
+    ):
+        """
+        Simulate one chunk of Euler full-truncation paths and return the
+        terminal stock prices. `normals` supplies two independent normals per
+        path one step at a time, correlated here with the Cholesky factor of
+        [[1, rho], [rho, 1]]; with pseudo-random draws memory is O(n_paths).
+
+        With `with_shocks`, also return the sum of the stock's normal shocks
+        (the Brownian motion at T in units of sqrt(dt)). All schemes share this
+        signature; `on_step`, if given, is called with the stock prices after
+        every step (see models.path_engine). `var0` may be an array with one
+        initial variance per path.
+        """
+        dt = T / timesteps
+        sqrt_dt = np.sqrt(dt)
+        rho_bar = np.sqrt(1 - rho**2)
+
+        S_current = np.full(n_paths, S, dtype=np.float32)
+        V_current = np.full(n_paths, var0, dtype=np.float32)
+        W_S = np.zeros(n_paths, dtype=np.float32) if with_shocks else None
+
+        for Z in normals.steps(n_paths):
+            Z_S = Z[0]
+            if with_shocks:
+                W_S += Z_S
+            Z_V = rho * Z[0] + rho_bar * Z[1]
+
+            V_prev = np.maximum(V_current, 0)
+            sqrt_V = np.sqrt(V_prev)
+
+            # Update variance; it may go negative, only its positive part
+            # enters the drift and diffusion (full truncation)
+            V_current += kappa * (theta - V_prev) * dt + volvol * sqrt_V * sqrt_dt * Z_V
+
+            # Update stock using V_prev
+            drift = (r - 0.5 * V_prev) * dt
+            diffusion = sqrt_V * sqrt_dt * Z_S
+            S_current *= np.exp(drift + diffusion)
+            if on_step is not None:
+                on_step(S_current)
+
+        return (S_current, W_S) if with_shocks else S_current
+
+    @staticmethod
+    def _qe_terminal(
+        normals,
+        n_paths,
+        S,
+        T,
+        r,
+        kappa,
+        theta,
+        rho,
+        volvol,
+        var0,
+        timesteps,
+        with_shocks=False,
+        on_step=None,
+    ):
+        """
+        Andersen (2008) Quadratic-Exponential scheme. The variance is drawn
+        from a moment-matched squared normal (psi <= 1.5) or a mixture of a
+        point mass at zero and an exponential, and log S uses the central
+        (gamma1 = gamma2 = 1/2) discretization with the martingale correction,
+        so E[S_T] = S e^{rT} holds per step. Accurate with ~10-20 steps a year.
+        """
+        dt = T / timesteps
+        ekdt = np.exp(-kappa * dt)
+        c1 = volvol**2 * ekdt * (1 - ekdt) / kappa
+        c2 = theta * volvol**2 * (1 - ekdt) ** 2 / (2 * kappa)
+        K1 = 0.5 * dt * (kappa * rho / volvol - 0.5) - rho / volvol
+        K2 = 0.5 * dt * (kappa * rho / volvol - 0.5) + rho / volvol
+        K3 = K4 = 0.5 * dt * (1 - rho**2)
+        A = K2 + 0.5 * K4
+        K0_plain = -rho * kappa * theta * dt / volvol
+        rho_bar = np.sqrt(1 - rho**2)
+
+        log_S = np.full(n_paths, np.log(S))
+        V = np.full(n_paths, var0, dtype=float)
+        W_S = np.zeros(n_paths) if with_shocks else None
+
+        for Z in normals.steps(n_paths):
+            Z_S, Z_V = Z[0], Z[1]
+            m = theta + (V - theta) * ekdt
+            psi = (V * c1 + c2) / m**2
+            quadratic = psi <= QE_PSI_CRITICAL
+
+            with np.errstate(divide="ignore", invalid="ignore"):
+                # Quadratic branch: V' = a (b + Z)^2
+                inv_psi = 2 / psi
+                b2 = inv_psi - 1 + np.sqrt(inv_psi * np.maximum(inv_psi - 1, 0))
+                a = m / (1 + b2)
+                V_quad = a * (np.sqrt(b2) + Z_V) ** 2
+                K0_quad = (
+                    -A * b2 * a / (1 - 2 * A * a)
+                    + 0.5 * np.log(1 - 2 * A * a)
+                    - (K1 + 0.5 * K3) * V
+                )
+
+                # Exponential branch: P(V' = 0) = p, else exponential with rate beta
+                p = (psi - 1) / (psi + 1)
+                beta = (1 - p) / m
+                U = ndtr(Z_V)
+                V_exp = np.where(U <= p, 0.0, np.log((1 - p) / (1 - U)) / beta)
+                K0_exp = -np.log(p + beta * (1 - p) / (beta - A)) - (K1 + 0.5 * K3) * V
+
+            V_next = np.where(quadratic, V_quad, V_exp)
+            K0 = np.where(quadratic, K0_quad, K0_exp)
+            # The correction needs A < 1/(2a) resp. A < beta
+            K0 = np.where(np.isfinite(K0), K0, K0_plain)
+
+            log_S += (
+                r * dt + K0 + K1 * V + K2 * V_next + np.sqrt(K3 * V + K4 * V_next) * Z_S
+            )
+            if with_shocks:
+                W_S += rho * Z_V + rho_bar * Z_S
+            if on_step is not None:
+                on_step(np.exp(log_S))
+            V = V_next
+
+        S_T = np.exp(log_S)
+        return (S_T, W_S) if with_shocks else S_T
+
+    @staticmethod
+    def _broadie_kaya_terminal(
+        normals,
+        n_paths,
+        S,
+        T,
+        r,
+        kappa,
+        theta,
+        rho,
+        volvol,
+        var0,
+        timesteps,
+        with_shocks=False,
+        on_step=None,
+    ):
         """
-        Heston Monte Carlo pricing using Euler discretization with full truncation.
+        Broadie-Kaya (2006) scheme with exact variance transitions, drawn from
+        the scaled noncentral chi-square law of V_{t+dt} given V_t. The
+        integrated variance over each step is approximated by the trapezoid
+        rule (V_t + V_{t+dt}) dt / 2 instead of the paper's exact sampling
+        (inverting its Bessel-function characteristic function), which keeps
+        the cost near QE's at the price of a small discretization bias.
+
+        Needs pseudo-random normals: the chi-square draws come from their
+        generator.
         """
+        rng = normals.rng
+        dt = T / timesteps
+        ekdt = np.exp(-kappa * dt)
+        scale = volvol**2 * (1 - ekdt) / (4 * kappa)
+        df = 4 * kappa * theta / volvol**2
+        rho_bar = np.sqrt(1 - rho**2)
+
+        log_S = np.full(n_paths, np.log(S))
+        V = np.full(n_paths, var0, dtype=float)
+        W_S = np.zeros(n_paths) if with_shocks else None
+
+        for Z in normals.steps(n_paths):
+            V_next = scale * rng.noncentral_chisquare(df, V * ekdt / scale)
+            integrated = 0.5 * (V + V_next) * dt
+            # int sqrt(V) dW_V from the variance dynamics
+            vol_shock = (V_next - V - kappa * theta * dt + kappa * integrated) / volvol
 
+            log_S += (
+                r * dt
+                - 0.5 * integrated
+                + rho * vol_shock
+                + rho_bar * np.sqrt(integrated) * Z[0]
+            )
+            if with_shocks:
+                W_S += Z[0]
+            if on_step is not None:
+                on_step(np.exp(log_S))
+            V = V_next
+
+        S_T = np.exp(log_S)
+        return (S_T, W_S) if with_shocks else S_T
+
+    @staticmethod
+    def _mc_setup(heston_params, scheme, sampler, steps_per_year, T):
+        """
+        Validate the Heston parameters and discretization for a Monte Carlo
+        run. Returns (kappa, theta, rho, volvol, var0), the scheme's
+        (methodology, path simulator, normals per step, dtype) and the number
+        of time steps.
+        """
         # Validate Heston parameters
         required_params = ["kappa", "theta", "rho", "xi", "v0"]
         for p in required_params:
             if p not in heston_params:
                 raise ValueError(f"Missing required parameter: {p}")
+        if scheme not in MC_SCHEMES:
+            raise ValueError(f"scheme must be one of {tuple(MC_SCHEMES)}")
+        if scheme == "broadie_kaya" and sampler != "pseudo":
+            raise ValueError("The broadie_kaya scheme needs the pseudo sampler")
 
         kappa = heston_params["kappa"]
         theta = heston_params["theta"]
         rho = heston_params["rho"]
         volvol = heston_params["xi"]
         var0 = heston_params["v0"]
-        steps = 500
+        methodology, steps, simulate_paths, dims, dtype = MC_SCHEMES[scheme]
+        steps = steps_per_year or steps
+        if steps <= 0:
+            raise ValueError("steps_per_year must be positive")
+        if scheme != "euler" and (volvol <= 0 or kappa <= 0):
+            raise ValueError(f"The {scheme} scheme needs positive xi and kappa")
 
-        start_time = time.perf_counter()
         # Calculate number of time steps
-        timesteps = int(T * steps)
-        dt = T / timesteps
+        timesteps = max(1, int(T * steps))
+        return (
+            (kappa, theta, rho, volvol, var0),
+            (methodology, simulate_paths, dims, dtype),
+            timesteps,
+        )
 
-        # Initialize arrays for stock prices and variances
-        S_current = np.full(num_simulations, S, dtype=np.float32)
-        V_current = np.full(num_simulations, var0, dtype=np.float32)
+    @staticmethod
+    def monte_carlo(
+        option_type: str,
+        S: float,
+        K: float,
+        T: float,
+        r: float,
+        sigma: float,
+        num_simulations: int = 100000,
+        chunk_size: int = 50000,
+        seed: Optional[int] = None,
+        workers: Optional[int] = None,
+        sampler: str = "pseudo",
+        replications: Optional[int] = None,
+        control_variate: Optional[str] = None,
+        target_stderr: Optional[float] = None,
+        max_time: Optional[float] = None,
+        scheme: str = "euler",
+        steps_per_year: Optional[int] = None,
+        greeks: Optional[str] = None,
+        **heston_params,
+    ) -> Dict[str, Any]:
+        """
+        Heston Monte Carlo pricing.
 
-        # Generate correlated standard normal random variables
-        Z_half = np.random.multivariate_normal(
-            mean=[0, 0],
-            cov=[[1, rho], [rho, 1]],
-            size=(num_simulations // 2, timesteps),
-        ).astype(np.float32)
-        Z = np.concatenate([Z_half, -Z_half], axis=0)
+        `scheme` selects the discretization: "euler" (full truncation, 500
+        steps a year by default), "qe" (Andersen QE, 16) or "broadie_kaya"
+        (exact variance with trapezoidal integrated variance, 16, pseudo
+        sampler only); `steps_per_year` overrides the default. See
+        benchmarks/heston_schemes.py for their bias against the
+        characteristic-function price.
 
-        # Simulation loop
-        for t in range(timesteps):
-            Z_S = Z[:, t, 0]
-            Z_V = Z[:, t, 1]
+        Paths are simulated in chunks of `chunk_size` and only running sums of
+        the payoffs are kept, so peak memory depends on the chunk size, not on
+        num_simulations or T. With the "pseudo" sampler the paths are split
+        across `workers` threads, each with its own antithetic stream spawned
+        from `seed`; a given (seed, workers) pair always reproduces the same
+        price. The "sobol" sampler uses randomized QMC (see
+        models.monte_carlo.estimate) with a Brownian bridge over the time steps.
 
-            V_prev = np.maximum(V_current, 0)
-            sqrt_V = np.sqrt(V_prev)
+        `control_variate` adds a control with a known expectation on the same
+        paths, with the coefficient fitted to minimize variance:
+        "stock" uses the terminal stock (E[S_T] = S e^{rT}); "black_scholes"
+        uses the payoff of a GBM driven by the same stock shocks, at the
+        volatility matching the expected average Heston variance, whose
+        expectation is the Black-Scholes price.
 
-            # Update variance
-            V_current += (
-                kappa * (theta - V_prev) * dt + volvol * sqrt_V * np.sqrt(dt) * Z_V
-            )
-            V_current = np.maximum(V_current, 0)
+        Given `target_stderr`, num_simulations is only a path budget: paths
+        are added in rounds until the standard error of the price reaches the
+        target, or `max_time` seconds have passed.
 
-            # Update stock using V_prev
-            drift = (r - 0.5 * V_prev) * dt
-            diffusion = sqrt_V * np.sqrt(dt) * Z_S
-            S_current *= np.exp(drift + diffusion)
+        `greeks` also estimates delta, gamma and vega (with standard errors)
+        on the same paths. Terminal prices are proportional to S, so delta is
+        pathwise ("pathwise") or a central difference on rescaled paths
+        ("bump"), and gamma is always the latter. Vega is the sensitivity to
+        the initial volatility sqrt(v0): each path is simulated again at
+        bumped v0 with the same normals, tripling the simulation cost. Not
+        available with broadie_kaya, whose chi-square draws cannot be shared.
+        """
 
-        # Calculate payoffs
-        if option_type.lower() == "call":
-            payoffs = np.maximum(S_current - K, 0)
-        elif option_type.lower() == "put":
-            payoffs = np.maximum(K - S_current, 0)
-        else:
+        if option_type.lower() not in ("call", "put"):
             raise ValueError("option_type must be 'call' or 'put'")
+        if chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+        if control_variate is not None and control_variate not in CONTROL_VARIATES:
+            raise ValueError(f"control_variate must be one of {CONTROL_VARIATES}")
+        if greeks is not None and greeks not in GREEK_METHODS:
+            raise ValueError(f"Heston greeks must be one of {GREEK_METHODS}")
+        if greeks is not None and control_variate is not None:
+            raise ValueError("greeks cannot be combined with a control_variate")
+        if greeks is not None and scheme == "broadie_kaya":
+            raise ValueError("greeks need the euler or qe scheme")
+        (
+            (kappa, theta, rho, volvol, var0),
+            (methodology, simulate_paths, dims, dtype),
+            timesteps,
+        ) = Heston._mc_setup(heston_params, scheme, sampler, steps_per_year, T)
+
+        start_time = time.perf_counter()
+        is_call = option_type.lower() == "call"
+        sign = 1.0 if is_call else -1.0
+        chunk = chunk_limit(sampler, chunk_size, dims, timesteps)
+        growth = np.exp(r * T)
+
+        def payoff(S_T):
+            return np.maximum(S_T - K, 0) if is_call else np.maximum(K - S_T, 0)
+
+        control_means = None
+        if control_variate == "stock":
+            control_means = [S * growth]
+        elif control_variate == "black_scholes":
+            # Expected average variance over [0, T]
+            decay = kappa * T
+            mean_var = theta + (var0 - theta) * (
+                (1 - np.exp(-decay)) / decay if decay > 0 else 1.0
+            )
+            bs_sigma = np.sqrt(max(mean_var, 1e-12))
+            bs_price = BlackScholes.closed_form_batch(
+                option_type.lower(), S, K, T, r, bs_sigma
+            )["price"]
+            control_means = [float(bs_price) * growth]
+            sqrt_dt = np.sqrt(T / timesteps)
+
+        if greeks is not None:
+            # Initial volatility bumped up and down (one-sided at zero)
+            vol0 = np.sqrt(var0)
+            vol_up = vol0 + (GREEK_BUMP * vol0 or GREEK_BUMP)
+            vol_down = max(vol0 - GREEK_BUMP * vol0, 0.0)
+            var0_blocks = np.array([var0, vol_up**2, vol_down**2])
+
+        def simulate_greeks(normals, n_paths, acc):
+            # Base, up and down paths on common random numbers
+            S_all = simulate_paths(
+                RepeatedNormals(normals, 3),
+                3 * n_paths,
+                S,
+                T,
+                r,
+                kappa,
+                theta,
+                rho,
+                volvol,
+                np.repeat(var0_blocks, n_paths),
+                timesteps,
+            )
+            S_T, S_up, S_down = S_all.reshape(3, n_paths)
+            values = payoff(S_T)
+            delta, gamma = spot_bump_greeks(payoff, S_T, S)
+            if greeks == "pathwise":
+                delta = sign * (sign * (S_T - K) > 0) * S_T / S
+            vega = (payoff(S_up) - payoff(S_down)) / (vol_up - vol_down)
+            acc.add(values, delta, gamma, vega)
+
+        def simulate(normals, n_worker):
+            acc = MomentAccumulator()
+            for start in range(0, n_worker, chunk):
+                n_paths = min(chunk, n_worker - start)
+                if greeks is not None:
+                    simulate_greeks(normals, n_paths, acc)
+                    continue
+                paths = simulate_paths(
+                    normals,
+                    n_paths,
+                    S,
+                    T,
+                    r,
+                    kappa,
+                    theta,
+                    rho,
+                    volvol,
+                    var0,
+                    timesteps,
+                    with_shocks=control_variate == "black_scholes",
+                )
+                if control_variate == "black_scholes":
+                    S_T, W_S = paths
+                    S_bs = S * np.exp(
+                        (r - 0.5 * bs_sigma**2) * T + bs_sigma * sqrt_dt * W_S
+                    )
+                    acc.add(payoff(S_T), payoff(S_bs))
+                elif control_variate == "stock":
+                    acc.add(payoff(paths), paths)
+                else:
+                    acc.add(payoff(paths))
+            return acc
 
-        # Discount and compute statistics
+        result = estimate(
+            simulate,
+            num_simulations,
+            dims=dims,
+            timesteps=timesteps,
+            dtype=dtype,
+            sampler=sampler,
+            seed=seed,
+            workers=workers,
+            replications=replications,
+            target_stderr=(
+                None
+                if target_stderr is None
+                # The target applies to the price, not to the Greeks
+                else [target_stderr * np.exp(r * T)] + [np.inf] * (3 if greeks else 0)
+            ),
+            max_time=max_time,
+            control_means=control_means,
+            outputs=1 if greeks is None else 4,
+        )
+
+        # Discount the payoff statistics
         discount_factor = np.exp(-r * T)
-        price = discount_factor * np.mean(payoffs)
-        stderr = discount_factor * np.std(payoffs) / np.sqrt(num_simulations)
+        price = discount_factor * np.atleast_1d(result.mean)[0]
+        stderr = discount_factor * np.atleast_1d(result.standard_error)[0]
+        greek_results = {}
+        if greeks is not None:
+            greek_results = {"greeks": greeks, **greek_fields(result, discount_factor)}
 
         elapsed_time = time.perf_counter() - start_time
         # Ensure elapsed_time is never zero to avoid display issues
@@ -122,6 +584,112 @@ class Heston:
             "price": float(price),
             "standard_error": float(stderr),
             "calculation_time": round(elapsed_time * 1000, 5),
-            "num_simulations": num_simulations,
-            "methodology": "Heston Monte Carlo (Euler with Full Truncation)",
+            "num_simulations": result.num_simulations,
+            "control_variate": control_variate,
+            "target_stderr": target_stderr,
+            "scheme": scheme,
+            "timesteps": timesteps,
+            **greek_results,
+            **result.info,
+            "methodology": methodology,
+        }
+
+    @staticmethod
+    def monte_carlo_paths(
+        payoffs: List[dict],
+        S: float,
+        T: float,
+        r: float,
+        sigma: float,
+        num_simulations: int = 100000,
+        chunk_size: int = 50000,
+        scheme: str = "euler",
+        steps_per_year: Optional[int] = None,
+        **options,
+    ) -> Dict[str, Any]:
+        """
+        Price several path-dependent payoffs (see models.path_engine) on one
+        set of Heston paths, monitored at every step of `scheme`. The Heston
+        parameters and the sampler/seed/workers/adaptive settings of
+        monte_carlo go in `options`.
+        """
+        if T <= 0:
+            raise ValueError("T must be positive")
+        heston_params = {p: options.pop(p) for p in HESTON_PARAMS if p in options}
+        (
+            (kappa, theta, rho, volvol, var0),
+            (methodology, simulate_paths, dims, dtype),
+            timesteps,
+        ) = Heston._mc_setup(
+            heston_params,
+            scheme,
+            options.get("sampler", "pseudo"),
+            steps_per_year,
+            T,
+        )
+        start_time = time.perf_counter()
+
+        def simulate(normals, n_paths, on_step):
+            return simulate_paths(
+                normals,
+                n_paths,
+                S,
+                T,
+                r,
+                kappa,
+                theta,
+                rho,
+                volvol,
+                var0,
+                timesteps,
+                on_step=on_step,
+            )
+
+        result = price_payoffs(
+            simulate,
+            [make_payoff(p) for p in payoffs],
+            S,
+            T,
+            r,
+            num_simulations,
+            timesteps,
+            dims=dims,
+            dtype=dtype,
+            chunk_size=chunk_size,
+            **options,
+        )
+
+        elapsed_time = time.perf_counter() - start_time
+        return {
+            **result,
+            "scheme": scheme,
+            "calculation_time": round(elapsed_time * 1000, 5),
+            "methodology": f"{methodology}, Path-Dependent",
         }
+
+
+# Discretizations for Heston.monte_carlo: methodology, default steps per
+# year, path simulator, normals per step and working precision
+MC_SCHEMES = {
+    "euler": (
+        "Heston Monte Carlo (Euler with Full Truncation)",
+        500,
+        Heston._euler_terminal,
+        2,
+        np.float32,
+    ),
+    "qe": (
+        "Heston Monte Carlo (Andersen QE)",
+        16,
+        Heston._qe_terminal,
+        2,
+        np.float64,
+    ),
+    "broadie_kaya": (
+        "Heston Monte Carlo (Broadie-Kaya, Trapezoidal Integrated Variance)",
+        16,
+        Heston._broadie_kaya_terminal,
+        1,
+        np.float64,
+    ),
+}
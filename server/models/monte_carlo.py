@@ -0,0 +1,499 @@
+import os
+import secrets
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from scipy.special import ndtri
+from scipy.stats import qmc
+from typing import Any, Callable, Iterator, List, NamedTuple, Optional, Tuple
+
+from utils.metrics import timed
+
+# Default number of parallel streams; results are reproducible for a given
+# (seed, workers) pair, so this is part of what a seed identifies
+MC_WORKERS = int(os.environ.get("MC_WORKERS", 1))
+
+# Independent scramblings used for the randomized QMC error estimate
+QMC_REPLICATIONS = int(os.environ.get("QMC_REPLICATIONS", 16))
+# Cap on Sobol coordinates held in memory per chunk (points x dimensions)
+QMC_CHUNK_ELEMENTS = int(os.environ.get("QMC_CHUNK_ELEMENTS", 2**22))
+SOBOL_MAX_DIMENSIONS = 21201  # Direction numbers shipped with scipy
+
+# First round of an adaptive (target standard error) run
+MC_PILOT_PATHS = int(os.environ.get("MC_PILOT_PATHS", 10000))
+
+SAMPLERS = ("pseudo", "sobol")
+
+# Monte Carlo Greeks estimated on the pricing paths, see greek_fields
+GREEKS = ("delta", "gamma", "vega")
+GREEK_METHODS = ("pathwise", "likelihood_ratio", "bump")
+# Relative size of common-random-numbers bumps (spot and volatility)
+GREEK_BUMP = float(os.environ.get("MC_GREEK_BUMP", 0.01))
+
+
+def seed_streams(
+    seed: Optional[int], workers: int
+) -> Tuple[List[np.random.Generator], int]:
+    """
+    One independent Generator per worker, spawned from a single SeedSequence.
+    Returns the generators and the root entropy, which reproduces the run
+    when passed back as `seed`.
+    """
+    if seed is None:
+        # Fresh seed that survives a round trip through JSON/JavaScript numbers
+        seed = secrets.randbits(53)
+    root = np.random.SeedSequence(seed)
+    generators = [np.random.Generator(np.random.PCG64(s)) for s in root.spawn(workers)]
+    return generators, root.entropy
+
+
+def split_paths(num_simulations: int, workers: int) -> List[int]:
+    """Split a path count as evenly as possible across workers"""
+    base, extra = divmod(num_simulations, workers)
+    return [base + (i < extra) for i in range(workers)]
+
+
+def run_parallel(
+    task: Callable,
+    streams: List,
+    counts,
+    workers: Optional[int] = None,
+):
+    """
+    Run task(stream, n_paths) for each random stream on up to `workers`
+    threads (NumPy releases the GIL in the random draws and array arithmetic)
+    and return the results in stream order, so combining them is
+    deterministic.
+    """
+    workers = min(workers or len(streams), len(streams))
+    if workers == 1:
+        return [task(stream, n) for stream, n in zip(streams, counts)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(task, streams, counts))
+
+
+class MomentAccumulator:
+    """
+    Running count, sums and cross-product sums of one or more sample columns
+    (e.g. a payoff and its control variates), mergeable across chunks/workers
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = None
+        self.cross = None
+
+    def add(self, *columns: np.ndarray):
+        columns = [np.asarray(c, dtype=np.float64) for c in columns]
+        total = np.array([c.sum() for c in columns])
+        cross = np.array([[(a * b).sum() for b in columns] for a in columns])
+        self.count += columns[0].size
+        if self.total is None:
+            self.total, self.cross = total, cross
+        else:
+            self.total += total
+            self.cross += cross
+        return self
+
+    def merge(self, other: "MomentAccumulator"):
+        if other.total is None:
+            return self
+        self.count += other.count
+        if self.total is None:
+            self.total, self.cross = other.total.copy(), other.cross.copy()
+        else:
+            self.total += other.total
+            self.cross += other.cross
+        return self
+
+    @property
+    def means(self) -> np.ndarray:
+        return self.total / self.count
+
+    @property
+    def covariance(self) -> np.ndarray:
+        means = self.means
+        return self.cross / self.count - np.outer(means, means)
+
+    @property
+    def mean(self) -> float:
+        """Mean of the first column"""
+        return self.means[0]
+
+    @property
+    def std(self) -> float:
+        """Standard deviation of the first column"""
+        return np.sqrt(max(self.covariance[0, 0], 0.0))
+
+
+def combine(accumulators: List[MomentAccumulator]) -> MomentAccumulator:
+    """Merge per-worker accumulators in order"""
+    combined = MomentAccumulator()
+    for acc in accumulators:
+        combined.merge(acc)
+    return combined
+
+
+@lru_cache(maxsize=32)
+def brownian_bridge(timesteps: int) -> Tuple[Tuple[int, int, int, float, float, float]]:
+    """
+    Construction order for a Brownian bridge on `timesteps` unit steps: the
+    terminal value first, then repeated midpoints. Each entry is
+    (index, left index or -1 for time zero, right index or -1 for none,
+    left weight, right weight, conditional std).
+    """
+    t = np.arange(1, timesteps + 1, dtype=float)
+    filled = np.zeros(timesteps, dtype=bool)
+    filled[-1] = True
+    order = [(timesteps - 1, -1, -1, 0.0, 0.0, float(np.sqrt(t[-1])))]
+
+    j = 0
+    for _ in range(1, timesteps):
+        while filled[j]:
+            j += 1
+        k = j
+        while not filled[k]:
+            k += 1
+        mid = j + (k - 1 - j) // 2
+        filled[mid] = True
+
+        t_left = t[j - 1] if j > 0 else 0.0
+        span = t[k] - t_left
+        order.append(
+            (
+                mid,
+                j - 1,
+                k,
+                float((t[k] - t[mid]) / span),
+                float((t[mid] - t_left) / span),
+                float(np.sqrt((t[mid] - t_left) * (t[k] - t[mid]) / span)),
+            )
+        )
+        j = k + 1 if k + 1 < timesteps else 0
+    return tuple(order)
+
+
+def bridge_increments(z: np.ndarray) -> np.ndarray:
+    """
+    Map independent normals z of shape (timesteps, n) to standard normal
+    Brownian increments, assigning the first rows (the best distributed
+    Sobol coordinates) to the coarsest features of the path.
+    """
+    W = np.empty_like(z)
+    for row, (index, left, right, w_left, w_right, std) in zip(
+        z, brownian_bridge(z.shape[0])
+    ):
+        W[index] = std * row
+        if right >= 0:
+            W[index] += w_right * W[right]
+        if left >= 0:
+            W[index] += w_left * W[left]
+    return np.diff(W, axis=0, prepend=np.zeros((1, z.shape[1]), dtype=z.dtype))
+
+
+class PseudoRandomNormals:
+    """Antithetic pseudo-random normals for `dims` Brownian motions"""
+
+    antithetic = True
+
+    def __init__(self, rng: np.random.Generator, dims: int, timesteps: int, dtype):
+        self.rng = rng
+        self.dims = dims
+        self.timesteps = timesteps
+        self.dtype = dtype
+
+    def steps(self, n_paths: int) -> Iterator[np.ndarray]:
+        """Per time step, an array (dims, n_paths) of standard normals"""
+        half = (n_paths + 1) // 2
+        for _ in range(self.timesteps):
+            Z = self.rng.standard_normal((self.dims, half), dtype=self.dtype)
+            yield np.concatenate([Z, -Z], axis=1)[:, :n_paths]
+
+
+class SobolNormals:
+    """
+    Scrambled Sobol normals for `dims` Brownian motions over `timesteps`
+    steps. Coordinates are interleaved across the motions and each path is
+    built with a Brownian bridge. Successive calls continue the sequence.
+    """
+
+    antithetic = False
+
+    def __init__(self, rng: np.random.Generator, dims: int, timesteps: int, dtype):
+        if dims * timesteps > SOBOL_MAX_DIMENSIONS:
+            raise ValueError(
+                f"Sobol sampling supports at most {SOBOL_MAX_DIMENSIONS} "
+                "dimensions (Brownian motions x time steps)"
+            )
+        self.engine = qmc.Sobol(dims * timesteps, scramble=True, seed=rng)
+        self.dims = dims
+        self.timesteps = timesteps
+        self.dtype = dtype
+
+    def steps(self, n_paths: int) -> Iterator[np.ndarray]:
+        """Per time step, an array (dims, n_paths) of standard normals"""
+        u = self.engine.random(n_paths)
+        eps = np.finfo(float).eps
+        z = ndtri(np.clip(u, eps, 1 - eps)).T
+        increments = np.stack(
+            [
+                bridge_increments(np.ascontiguousarray(z[d :: self.dims]))
+                for d in range(self.dims)
+            ],
+            axis=1,
+        ).astype(self.dtype)
+        yield from increments
+
+
+def control_coefficients(acc: MomentAccumulator) -> np.ndarray:
+    """
+    Variance-minimizing coefficients of the first column on the others:
+    beta = Cov(X, X)^-1 Cov(X, Y)
+    """
+    cov = acc.covariance
+    return np.linalg.lstsq(cov[1:, 1:], cov[1:, 0], rcond=None)[0]
+
+
+def controlled_mean(acc: MomentAccumulator, beta, control_means) -> float:
+    """Mean of Y - beta . (X - E[X])"""
+    means = acc.means
+    return means[0] - beta @ (means[1:] - control_means)
+
+
+def control_info(beta, plain_variance: float, controlled_variance: float) -> dict:
+    """Response fields describing a control-variate fit"""
+    return {
+        "control_coefficients": [float(b) for b in beta],
+        "variance_reduction": (
+            float(plain_variance / controlled_variance)
+            if controlled_variance > 0
+            else None
+        ),
+    }
+
+
+def spot_bump_greeks(payoff: Callable, S_T, S: float, bump: float = GREEK_BUMP):
+    """
+    Per-path central differences of payoff(S_T) in the spot on common random
+    numbers: (delta, gamma) columns. Terminal prices are proportional to the
+    spot under GBM and Heston, so bumped paths are rescaled, not re-simulated.
+    """
+    h = bump * S
+    up = payoff(S_T * (1 + bump))
+    down = payoff(S_T * (1 - bump))
+    return (up - down) / (2 * h), (up - 2 * payoff(S_T) + down) / h**2
+
+
+def greek_fields(result: "MCEstimate", discount_factor: float) -> dict:
+    """
+    Response fields for an estimate whose columns are the undiscounted
+    payoff followed by the GREEKS; vega is per 1% change in volatility,
+    like BlackScholes.closed_form.
+    """
+    fields = {}
+    for i, name in enumerate(GREEKS, start=1):
+        scale = discount_factor * (0.01 if name == "vega" else 1.0)
+        fields[name] = float(scale * result.mean[i])
+        fields[f"{name}_standard_error"] = float(scale * result.standard_error[i])
+    return fields
+
+
+class RepeatedNormals:
+    """
+    Normal source that repeats each draw of `normals` side by side `copies`
+    times, so one simulator call runs several parameter sets (one per block
+    of paths) on common random numbers.
+    """
+
+    def __init__(self, normals, copies: int):
+        self.normals = normals
+        self.copies = copies
+        self.antithetic = normals.antithetic
+        self.rng = getattr(normals, "rng", None)
+
+    def steps(self, n_paths: int) -> Iterator[np.ndarray]:
+        for Z in self.normals.steps(n_paths // self.copies):
+            yield np.tile(Z, self.copies)
+
+
+def chunk_limit(sampler: str, chunk_size: int, dims: int, timesteps: int) -> int:
+    """Paths per chunk; Sobol chunks are powers of two bounded by memory"""
+    if sampler != "sobol":
+        return chunk_size
+    limit = max(1, min(chunk_size, QMC_CHUNK_ELEMENTS // (dims * timesteps)))
+    return 1 << (limit.bit_length() - 1)
+
+
+class MCEstimate(NamedTuple):
+    mean: Any  # float, or an array with several outputs
+    standard_error: Any
+    num_simulations: int
+    info: dict  # seed, workers, sampler, ... for the response
+
+
+def _pseudo_summary(accs, n, control_means, outputs) -> Tuple[Any, Any, dict]:
+    """Pooled mean and std / sqrt(n) over all streams"""
+    acc = combine(accs)
+    if control_means is None:
+        std = np.sqrt(np.maximum(np.diag(acc.covariance)[:outputs], 0.0))
+        return acc.means[:outputs], std / np.sqrt(n), {}
+
+    beta = control_coefficients(acc)
+    cov = acc.covariance
+    variance = max(cov[0, 0] - beta @ cov[1:, 0], 0.0)
+    return (
+        np.array([controlled_mean(acc, beta, control_means)]),
+        np.array([np.sqrt(variance / n)]),
+        control_info(beta, cov[0, 0], variance),
+    )
+
+
+def _replication_summary(accs, control_means, outputs) -> Tuple[Any, Any, dict]:
+    """Mean of the replication means and the standard error of their spread"""
+    means = np.array([acc.means[:outputs] for acc in accs])
+    extra = {}
+    if control_means is not None:
+        # One coefficient fitted on all replications, applied to each
+        beta = control_coefficients(combine(accs))
+        plain = means.var(ddof=1)
+        means = np.array([[controlled_mean(acc, beta, control_means)] for acc in accs])
+        extra = control_info(beta, plain, means.var(ddof=1))
+    return (
+        means.mean(axis=0),
+        means.std(ddof=1, axis=0) / np.sqrt(len(accs)),
+        extra,
+    )
+
+
+@timed("mc_simulation")
+def estimate(
+    task: Callable,
+    num_simulations: int,
+    dims: int = 1,
+    timesteps: int = 1,
+    dtype=np.float64,
+    sampler: str = "pseudo",
+    seed: Optional[int] = None,
+    workers: Optional[int] = None,
+    replications: Optional[int] = None,
+    control_means=None,
+    target_stderr=None,
+    max_time: Optional[float] = None,
+    outputs: int = 1,
+) -> MCEstimate:
+    """
+    Run task(normals, n_paths) -> MomentAccumulator of undiscounted samples.
+
+    The first `outputs` columns are estimated separately (several payoffs
+    from one pass); with more than one, the estimate's mean and standard
+    error are arrays and an adaptive run waits for every output to reach
+    `target_stderr`, which may also be one target per output (np.inf leaves
+    an output untargeted).
+
+    With `control_means`, the task adds the payoff followed by control
+    variates with those known expectations; the estimate uses the
+    variance-minimizing coefficients fitted on all paths and reports them
+    with the variance reduction factor.
+
+    "pseudo" splits the paths across `workers` independent streams, and the
+    standard error is the sample std over sqrt(num_simulations).
+    "sobol" runs `replications` independently scrambled Sobol point sets of
+    2**k points each (num_simulations is rounded up) and the standard error
+    comes from the spread of the replication means.
+
+    With `target_stderr`, num_simulations becomes a path budget: paths are
+    simulated in rounds, each stream continuing where it stopped, until the
+    standard error reaches the target, the budget is spent or `max_time`
+    seconds have passed. Pseudo-random rounds are sized from the observed
+    error; Sobol rounds double the points of every replication. Without a
+    time limit the result is reproducible for a given seed, workers, target
+    and budget.
+    """
+    if sampler not in SAMPLERS:
+        raise ValueError(f"sampler must be one of {SAMPLERS}")
+    workers = workers or MC_WORKERS
+    if num_simulations <= 0 or workers <= 0:
+        raise ValueError("num_simulations and workers must be positive")
+    if control_means is not None and outputs != 1:
+        raise ValueError("Control variates support a single payoff")
+    adaptive = target_stderr is not None
+    if adaptive:
+        targets = np.broadcast_to(np.asarray(target_stderr, dtype=float), (outputs,))
+        if np.any(targets <= 0):
+            raise ValueError("target_stderr must be positive")
+    start_time = time.perf_counter()
+
+    if sampler == "pseudo":
+        workers = min(workers, num_simulations)
+        generators, entropy = seed_streams(seed, workers)
+        sources = [PseudoRandomNormals(g, dims, timesteps, dtype) for g in generators]
+        info = {"seed": entropy, "workers": workers, "sampler": sampler}
+
+        def summary(accs, n):
+            return _pseudo_summary(accs, n, control_means, outputs)
+
+        def next_round(done, stderr, elapsed):
+            # The standard error shrinks like 1/sqrt(n): aim 10% past the target
+            ratio = np.max(stderr / targets)
+            needed = int(np.ceil(1.1 * done * ratio**2)) - done
+            size = min(max(needed, MC_PILOT_PATHS), num_simulations - done)
+            if max_time is not None:
+                size = min(size, int((max_time - elapsed) * done / elapsed))
+            return split_paths(size, workers) if size > 0 else None
+
+        first = min(num_simulations, MC_PILOT_PATHS) if adaptive else num_simulations
+        counts = split_paths(first, workers)
+    else:
+        replications = replications or QMC_REPLICATIONS
+        if replications < 2:
+            raise ValueError("Sobol sampling needs at least 2 replications")
+        # One stream per replication, so the result does not depend on workers
+        generators, entropy = seed_streams(seed, replications)
+        sources = [SobolNormals(g, dims, timesteps, dtype) for g in generators]
+        workers = min(workers, replications)
+        info = {
+            "seed": entropy,
+            "workers": workers,
+            "sampler": sampler,
+            "replications": replications,
+        }
+
+        def summary(accs, n):
+            return _replication_summary(accs, control_means, outputs)
+
+        def next_round(done, stderr, elapsed):
+            # Double every replication (keeping 2**k points) while it fits
+            if 2 * done > num_simulations:
+                return None
+            if max_time is not None and 2 * elapsed > max_time:
+                return None
+            return [done // replications] * replications
+
+        first = min(num_simulations, MC_PILOT_PATHS) if adaptive else num_simulations
+        points = 1 << max(0, int(np.ceil(np.log2(first / replications))))
+        counts = [points] * replications
+
+    accs = [MomentAccumulator() for _ in sources]
+    done = 0
+    while True:
+        for acc, result in zip(accs, run_parallel(task, sources, counts, workers)):
+            acc.merge(result)
+        done += sum(counts)
+        mean, stderr, extra = summary(accs, done)
+
+        if not adaptive or np.all(stderr <= targets):
+            break
+        elapsed = time.perf_counter() - start_time
+        if max_time is not None and elapsed >= max_time:
+            break
+        counts = next_round(done, stderr, elapsed)
+        if counts is None:
+            break
+
+    info.update(extra)
+    if adaptive:
+        info["converged"] = bool(np.all(stderr <= targets))
+    if outputs == 1:
+        mean, stderr = float(mean[0]), float(stderr[0])
+    return MCEstimate(mean, stderr, done, info)
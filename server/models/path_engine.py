@@ -0,0 +1,232 @@
+import numpy as np
+from typing import Any, Callable, Dict, List, Optional
+
+from models.monte_carlo import MomentAccumulator, chunk_limit, estimate
+
+PAYOFF_TYPES = ("european", "asian", "barrier", "lookback")
+BARRIER_TYPES = ("up-and-out", "up-and-in", "down-and-out", "down-and-in")
+AVERAGING_TYPES = ("arithmetic", "geometric")
+
+
+class PathStatistics:
+    """
+    Running per-path statistics of the monitored prices (one observation per
+    simulation step), updated in place so memory stays O(n_paths) whatever
+    the number of steps. Only the statistics some payoff needs are kept.
+    """
+
+    def __init__(self, S0: float, n_paths: int, needs):
+        self.steps = 0
+        self.total = np.zeros(n_paths) if "sum" in needs else None
+        self.log_total = np.zeros(n_paths) if "log_sum" in needs else None
+        self.maximum = np.full(n_paths, float(S0)) if "max" in needs else None
+        self.minimum = np.full(n_paths, float(S0)) if "min" in needs else None
+
+    def update(self, S: np.ndarray):
+        self.steps += 1
+        if self.total is not None:
+            self.total += S
+        if self.log_total is not None:
+            self.log_total += np.log(S)
+        if self.maximum is not None:
+            np.maximum(self.maximum, S, out=self.maximum)
+        if self.minimum is not None:
+            np.minimum(self.minimum, S, out=self.minimum)
+
+
+class Payoff:
+    """Payoff at maturity of a (possibly path-dependent) option"""
+
+    type = "european"
+
+    def __init__(self, option_type: str, strike: Optional[float]):
+        if option_type.lower() not in ("call", "put"):
+            raise ValueError("option_type must be 'call' or 'put'")
+        self.option_type = option_type.lower()
+        self.sign = 1 if self.option_type == "call" else -1
+        self.strike = strike
+
+    @property
+    def needs(self) -> set:
+        """PathStatistics this payoff reads"""
+        return set()
+
+    def _vanilla(self, S: np.ndarray) -> np.ndarray:
+        return np.maximum(self.sign * (S - self.strike), 0)
+
+    def value(self, S_T: np.ndarray, stats: PathStatistics) -> np.ndarray:
+        return self._vanilla(S_T)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "type": self.type,
+            "option_type": self.option_type,
+            "strike": self.strike,
+        }
+
+
+class AsianPayoff(Payoff):
+    """Fixed-strike Asian option on the average over the monitoring dates"""
+
+    type = "asian"
+
+    def __init__(self, option_type: str, strike: float, averaging: str):
+        super().__init__(option_type, strike)
+        if averaging not in AVERAGING_TYPES:
+            raise ValueError(f"averaging must be one of {AVERAGING_TYPES}")
+        self.averaging = averaging
+
+    @property
+    def needs(self):
+        return {"sum"} if self.averaging == "arithmetic" else {"log_sum"}
+
+    def value(self, S_T, stats):
+        if self.averaging == "arithmetic":
+            average = stats.total / stats.steps
+        else:
+            average = np.exp(stats.log_total / stats.steps)
+        return self._vanilla(average)
+
+    def describe(self):
+        return dict(super().describe(), averaging=self.averaging)
+
+
+class BarrierPayoff(Payoff):
+    """Knock-in/knock-out vanilla, barrier monitored at every simulation step"""
+
+    type = "barrier"
+
+    def __init__(self, option_type: str, strike: float, barrier: float, kind: str):
+        super().__init__(option_type, strike)
+        if kind not in BARRIER_TYPES:
+            raise ValueError(f"barrier_type must be one of {BARRIER_TYPES}")
+        self.barrier = barrier
+        self.kind = kind
+
+    @property
+    def needs(self):
+        return {"max"} if self.kind.startswith("up") else {"min"}
+
+    def value(self, S_T, stats):
+        if self.kind.startswith("up"):
+            hit = stats.maximum >= self.barrier
+        else:
+            hit = stats.minimum <= self.barrier
+        alive = hit if self.kind.endswith("in") else ~hit
+        return np.where(alive, self._vanilla(S_T), 0.0)
+
+    def describe(self):
+        return dict(super().describe(), barrier=self.barrier, barrier_type=self.kind)
+
+
+class LookbackPayoff(Payoff):
+    """
+    Lookback option: floating strike without `strike` (call S_T - min,
+    put max - S_T), fixed strike on the extreme otherwise
+    """
+
+    type = "lookback"
+
+    @property
+    def needs(self):
+        floating = self.strike is None
+        return {"min"} if floating == (self.sign == 1) else {"max"}
+
+    def value(self, S_T, stats):
+        if self.strike is None:
+            extreme = stats.minimum if self.sign == 1 else stats.maximum
+            return self.sign * (S_T - extreme)
+        extreme = stats.maximum if self.sign == 1 else stats.minimum
+        return self._vanilla(extreme)
+
+
+def make_payoff(spec: Dict[str, Any]) -> Payoff:
+    """Build a payoff from a PathPayoff request dict"""
+    kind = spec.get("type", "european")
+    option_type = spec.get("option_type")
+    strike = spec.get("strike")
+    if option_type is None:
+        raise ValueError("Missing option_type for payoff")
+    if strike is None and kind != "lookback":
+        raise ValueError(f"Missing strike for {kind} payoff")
+
+    if kind == "european":
+        return Payoff(option_type, strike)
+    if kind == "asian":
+        return AsianPayoff(option_type, strike, spec.get("averaging") or "arithmetic")
+    if kind == "barrier":
+        if spec.get("barrier") is None or spec.get("barrier_type") is None:
+            raise ValueError("Barrier payoffs need barrier and barrier_type")
+        return BarrierPayoff(option_type, strike, spec["barrier"], spec["barrier_type"])
+    if kind == "lookback":
+        return LookbackPayoff(option_type, strike)
+    raise ValueError(f"Payoff type must be one of {PAYOFF_TYPES}")
+
+
+def price_payoffs(
+    simulate: Callable,
+    payoffs: List[Payoff],
+    S: float,
+    T: float,
+    r: float,
+    num_simulations: int,
+    timesteps: int,
+    dims: int,
+    dtype,
+    chunk_size: int,
+    target_stderr: Optional[float] = None,
+    **mc_options,
+) -> Dict[str, Any]:
+    """
+    Price several payoffs on one set of simulated paths.
+
+    simulate(normals, n_paths, on_step) runs one chunk of paths, calling
+    on_step with the stock prices after every step, and returns S_T. The
+    payoffs only see streaming PathStatistics, so full paths are never
+    stored. mc_options are passed to models.monte_carlo.estimate;
+    target_stderr (in price units) applies to the noisiest payoff.
+    """
+    if not payoffs:
+        raise ValueError("At least one payoff is required")
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    needs = set().union(*(p.needs for p in payoffs))
+    chunk = chunk_limit(
+        mc_options.get("sampler", "pseudo"), chunk_size, dims, timesteps
+    )
+
+    def task(normals, n_worker):
+        acc = MomentAccumulator()
+        for start in range(0, n_worker, chunk):
+            n_paths = min(chunk, n_worker - start)
+            stats = PathStatistics(S, n_paths, needs)
+            S_T = simulate(normals, n_paths, stats.update)
+            acc.add(*(payoff.value(S_T, stats) for payoff in payoffs))
+        return acc
+
+    discount_factor = np.exp(-r * T)
+    result = estimate(
+        task,
+        num_simulations,
+        dims=dims,
+        timesteps=timesteps,
+        dtype=dtype,
+        outputs=len(payoffs),
+        target_stderr=(
+            None if target_stderr is None else target_stderr / discount_factor
+        ),
+        **mc_options,
+    )
+    prices = discount_factor * np.atleast_1d(result.mean)
+    stderrs = discount_factor * np.atleast_1d(result.standard_error)
+
+    return {
+        "payoffs": [
+            dict(payoff.describe(), price=float(price), standard_error=float(stderr))
+            for payoff, price, stderr in zip(payoffs, prices, stderrs)
+        ],
+        "num_simulations": result.num_simulations,
+        "timesteps": timesteps,
+        "target_stderr": target_stderr,
+        **result.info,
+    }
@@ -1,23 +1,62 @@
-from fastapi import APIRouter, HTTPException
+import json
+import numpy as np
+from fastapi import APIRouter, BackgroundTasks, HTTPException
+from fastapi.responses import StreamingResponse
 from models import black_scholes, heston
-from schemas import PricingRequest, PricingResult, CalibrationResult, CalibrationRequest
+from schemas import (
+    PricingRequest,
+    PricingResult,
+    CalibrationResult,
+    CalibrationRequest,
+    BatchPricingRequest,
+    BatchPricingResult,
+    BatchCalibrationRequest,
+    PathPricingRequest,
+    PathPricingResult,
+    ImpliedVolatilityRequest,
+    ImpliedVolatilityResult,
+    ProfilingSettings,
+)
 import datetime
 from utils.fetch_data import get_market_data
-from utils.calibrateHeston import calibrate_heston
+from utils.calibrateHeston import calibrate_heston, load_calibration_chain
+from utils.batch_pricing import contracts_frame, mc_options, price_batch
+from utils.batch_calibration import calibrate_many
+from utils.calibration_cache import default_cache
+from utils.surface_cache import HestonSurface, default_surface_cache
+from utils.metrics import profiling_settings, recent_profiles, set_profiling
+from utils.executors import (
+    ExecutorOverloaded,
+    cpu_executor,
+    executor_stats,
+    run_cpu,
+    run_io,
+)
 
 router = APIRouter()
 
 
 @router.get("/market-data/{symbol}")
 async def get_options(symbol: str, total_results: int = 12):
-    data = get_market_data(symbol, total_results)
+    data = await run_io(get_market_data, symbol, total_results)
     if "error" in data:
         raise HTTPException(status_code=400, detail=data["error"])
     return data
 
 
+async def prepare_surface(symbol: str, params: dict):
+    """Precompute the quote surface of freshly calibrated parameters"""
+    try:
+        surface = await run_cpu(HestonSurface.build, params)
+    except ExecutorOverloaded:
+        return  # Quotes keep using the quadrature pricer
+    default_surface_cache().put(surface, symbol=symbol)
+
+
 @router.post("/calibrate", response_model=CalibrationResult)
-async def Calibrate_Heston(request: CalibrationRequest):
+async def Calibrate_Heston(
+    request: CalibrationRequest, background_tasks: BackgroundTasks
+):
     try:
         # Setup parameters for calibration
         calibrate_params = {
@@ -25,10 +64,19 @@ async def Calibrate_Heston(request: CalibrationRequest):
             "expiration": request.expiration,
             "underlying_price": request.underlying_price,
             "risk_free_rate": request.risk_free_rate,
+            "method": request.method,
+            "cache": default_cache() if request.use_cache else None,
         }
 
-        # Call calibration function
-        result = calibrate_heston(**calibrate_params)
+        # Fetch the chain on the I/O pool (sharing the market-data cache),
+        # then fit on the CPU pool
+        calibrate_params["data"] = await run_io(
+            load_calibration_chain,
+            request.symbol,
+            request.expiration,
+            request.underlying_price,
+        )
+        result = await run_cpu(calibrate_heston, **calibrate_params)
 
         # Check for errors
         if not result["success"]:
@@ -36,6 +84,19 @@ async def Calibrate_Heston(request: CalibrationRequest):
                 status_code=400, detail=result.get("error", "Calibration failed")
             )
 
+        # Interactive quotes at these parameters will come from a surface
+        background_tasks.add_task(
+            prepare_surface,
+            request.symbol,
+            {
+                "kappa": result["kappa"],
+                "theta": result["theta"],
+                "rho": result["rho"],
+                "xi": result["volvol"],
+                "v0": result["var0"],
+            },
+        )
+
         # Return successful result - FIX PARAMETER NAMES HERE
         return CalibrationResult(
             kappa=result["kappa"],
@@ -46,13 +107,42 @@ async def Calibrate_Heston(request: CalibrationRequest):
             optimization_time=result["optimization_time"],
             mse=result["mse"],
             rmse=result["rmse"],
+            method=result["method"],
+            iterations=result["iterations"],
+            function_evaluations=result["function_evaluations"],
+            cached=result["cached"],
+            warm_start=result["warm_start"],
             success=True,
         )
 
+    except (HTTPException, ExecutorOverloaded):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/calibrate/batch")
+async def calibrate_heston_batch(request: BatchCalibrationRequest):
+    """Stream one NDJSON line per (symbol, expiration) job as it finishes"""
+    jobs = [
+        dict(job.model_dump(), method=request.method, use_cache=request.use_cache)
+        for job in request.jobs
+    ]
+
+    # Refuse up front when the pool is saturated: a 503 cannot be sent once
+    # streaming has started. Jobs are then fed to the pool as slots free up.
+    if cpu_executor.available() < 1:
+        raise ExecutorOverloaded("cpu pool backlog is full")
+
+    def results():
+        for result in calibrate_many(
+            jobs, max_workers=request.max_workers, executor=cpu_executor
+        ):
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
 @router.post("/price", response_model=PricingResult)
 async def calculate_price(request: PricingRequest):
     # Common parameters for all models
@@ -66,6 +156,7 @@ async def calculate_price(request: PricingRequest):
     }
 
     result = {}
+    engine = None
 
     try:
         if request.model_type == "blackScholes":
@@ -73,10 +164,11 @@ async def calculate_price(request: PricingRequest):
             bs_params = base_params.copy()
 
             if request.solution_type == "closedForm":
+                # Microseconds: not worth a trip to the process pool
                 result = black_scholes.BlackScholes.closed_form(**bs_params)
             elif request.solution_type == "monteCarlo":
-                bs_params["num_simulations"] = request.monte_carlo_simulations
-                result = black_scholes.BlackScholes.monte_carlo(**bs_params)
+                bs_params.update(mc_options(request))
+                engine, params = black_scholes.BlackScholes.monte_carlo, bs_params
 
         elif request.model_type == "heston":
             # Heston-specific parameters
@@ -92,16 +184,28 @@ async def calculate_price(request: PricingRequest):
             )
 
             if request.solution_type == "characteristicFunction":
-                result = heston.Heston.characteristic_function(**heston_params)
+                # Served in-process when a precomputed surface covers the quote
+                if request.use_surface:
+                    result = default_surface_cache().quote(**heston_params) or {}
+                if not result:
+                    engine = heston.Heston.characteristic_function
+            elif request.solution_type == "fft":
+                engine = heston.Heston.fft
             elif request.solution_type == "monteCarlo":
-                heston_params["num_simulations"] = request.monte_carlo_simulations
-                result = heston.Heston.monte_carlo(**heston_params)
+                heston_params.update(mc_options(request))
+                engine = heston.Heston.monte_carlo
+            params = heston_params
 
         else:
             raise HTTPException(status_code=400, detail="Invalid model type")
 
+        if engine is not None:
+            result = await run_cpu(engine, **params)
+
     except NotImplementedError:
         raise HTTPException(status_code=501, detail="Solution not implemented")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except TypeError as e:
         raise HTTPException(
             status_code=400, detail=f"Missing required parameter: {str(e)}"
@@ -110,3 +214,103 @@ async def calculate_price(request: PricingRequest):
     return PricingResult(
         **result,
     )
+
+
+@router.post("/price/paths", response_model=PathPricingResult)
+async def calculate_path_prices(request: PathPricingRequest):
+    """Price path-dependent payoffs (Asian, barrier, lookback) by Monte Carlo"""
+    params = {
+        "payoffs": [payoff.model_dump() for payoff in request.payoffs],
+        "S": request.underlying_price,
+        "T": request.yearsToExpiration,
+        "r": request.risk_free_rate,
+        "sigma": request.volatility,
+    }
+    params.update(mc_options(request))
+
+    if request.model_type == "blackScholes":
+        if params.pop("scheme", None) is not None:
+            raise HTTPException(status_code=400, detail="mc_scheme is Heston only")
+        engine = black_scholes.BlackScholes.monte_carlo_paths
+    elif request.model_type == "heston":
+        params.update(
+            {
+                name: getattr(request, name)
+                for name in heston.HESTON_PARAMS
+                if getattr(request, name) is not None
+            }
+        )
+        engine = heston.Heston.monte_carlo_paths
+    else:
+        raise HTTPException(status_code=400, detail="Invalid model type")
+
+    try:
+        result = await run_cpu(engine, **params)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return PathPricingResult(**result)
+
+
+@router.post("/price/batch", response_model=BatchPricingResult)
+async def calculate_price_batch(request: BatchPricingRequest):
+    try:
+        contracts = contracts_frame(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return BatchPricingResult(**await run_cpu(price_batch, contracts))
+
+
+@router.post("/implied-volatility", response_model=ImpliedVolatilityResult)
+async def calculate_implied_volatility(request: ImpliedVolatilityRequest):
+    """Invert Black-Scholes for a whole chain in one vectorized solve"""
+    try:
+        result = await run_cpu(
+            black_scholes.BlackScholes.implied_volatility_batch,
+            request.option_type,
+            request.market_price,
+            request.underlying_price,
+            request.strike_price,
+            request.yearsToExpiration,
+            request.risk_free_rate,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    vols = np.atleast_1d(result["implied_volatility"])
+    return ImpliedVolatilityResult(
+        count=vols.size,
+        implied_volatility=[None if np.isnan(v) else float(v) for v in vols],
+        converged=np.atleast_1d(result["converged"]).tolist(),
+        iterations=result["iterations"],
+        methodology=result["methodology"],
+        calculation_time=result["calculation_time"],
+    )
+
+
+@router.get("/executors")
+async def get_executor_stats():
+    """Pool sizes, current backlog and backlog limits"""
+    return executor_stats()
+
+
+@router.get("/surface-cache")
+async def get_surface_cache_stats():
+    """Cached Heston quote surfaces and their hit/miss counts"""
+    return default_surface_cache().stats()
+
+
+@router.get("/profiling")
+async def get_profiling():
+    """Sampling settings and the profiles kept from slow sampled requests"""
+    return {**profiling_settings(), "profiles": recent_profiles()}
+
+
+@router.put("/profiling")
+async def update_profiling(settings: ProfilingSettings):
+    """Switch sampled profiling on or off, or change its threshold"""
+    try:
+        return set_profiling(settings.sample_rate, settings.min_seconds)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,6 +1,22 @@
-from typing import Optional
+from typing import List, Optional, Union
 from pydantic import BaseModel, ConfigDict
 
+# Monte Carlo request fields and the engine keyword each one maps to
+MC_OPTION_FIELDS = {
+    "monte_carlo_simulations": "num_simulations",
+    "mc_chunk_size": "chunk_size",
+    "seed": "seed",
+    "mc_workers": "workers",
+    "sampler": "sampler",
+    "qmc_replications": "replications",
+    "control_variate": "control_variate",
+    "target_stderr": "target_stderr",
+    "mc_max_time": "max_time",
+    "mc_scheme": "scheme",
+    "mc_steps_per_year": "steps_per_year",
+    "mc_greeks": "greeks",
+}
+
 
 class MarketDataRequest(BaseModel):
     symbol: str
@@ -27,11 +43,154 @@ class PricingRequest(BaseModel):
 
     # Monte Carlo parameters
     monte_carlo_simulations: Optional[int] = None
+    mc_chunk_size: Optional[int] = None  # Paths simulated per chunk
+    seed: Optional[int] = None  # Reproducible runs; echoed back in the result
+    mc_workers: Optional[int] = None  # Parallel random streams (part of the seed)
+    sampler: Optional[str] = None  # "pseudo" (default) or "sobol" (randomized QMC)
+    qmc_replications: Optional[int] = None  # Sobol scramblings for the error estimate
+    control_variate: Optional[str] = None  # Heston: "stock" or "black_scholes"
+    # Adaptive runs: stop at this standard error, monte_carlo_simulations and
+    # mc_max_time (seconds) become the budget
+    target_stderr: Optional[float] = None
+    mc_max_time: Optional[float] = None
+    mc_scheme: Optional[str] = None  # Heston: "euler", "qe" or "broadie_kaya"
+    mc_steps_per_year: Optional[int] = None  # Defaults per scheme
+    # Delta, gamma and vega on the pricing paths: "pathwise", "bump" or
+    # (Black-Scholes) "likelihood_ratio"
+    mc_greeks: Optional[str] = None
+
+    # Heston characteristicFunction: quote from a precomputed price surface
+    # (see utils/surface_cache.py) when one covers the contract
+    use_surface: bool = True
 
     # Disable protected namespaces to avoid conflicts
     model_config = ConfigDict(protected_namespaces=())
 
 
+class PathPayoff(BaseModel):
+    type: str = "european"  # "european", "asian", "barrier" or "lookback"
+    option_type: str
+    strike: Optional[float] = None  # Lookbacks without a strike are floating
+    barrier: Optional[float] = None
+    barrier_type: Optional[str] = None  # "up-and-out", "down-and-in", ...
+    averaging: Optional[str] = None  # Asian: "arithmetic" (default) or "geometric"
+
+
+class PathPricingRequest(BaseModel):
+    """Several path-dependent payoffs priced on one set of simulated paths"""
+
+    model_type: str
+    underlying_price: float
+    yearsToExpiration: float
+    risk_free_rate: float
+    volatility: float
+    payoffs: List[PathPayoff]
+
+    # Heston parameters
+    kappa: Optional[float] = None
+    theta: Optional[float] = None
+    xi: Optional[float] = None
+    rho: Optional[float] = None
+    v0: Optional[float] = None
+
+    # Monte Carlo parameters, as in PricingRequest
+    monte_carlo_simulations: Optional[int] = None
+    mc_chunk_size: Optional[int] = None
+    seed: Optional[int] = None
+    mc_workers: Optional[int] = None
+    sampler: Optional[str] = None
+    qmc_replications: Optional[int] = None
+    target_stderr: Optional[float] = None  # Applies to the noisiest payoff
+    mc_max_time: Optional[float] = None
+    mc_scheme: Optional[str] = None  # Heston only
+    mc_steps_per_year: Optional[int] = None  # Monitoring frequency
+
+    model_config = ConfigDict(protected_namespaces=())
+
+
+class PathPricingResult(BaseModel):
+    payoffs: List[dict]
+    num_simulations: int
+    model_config = ConfigDict(extra="allow")
+
+
+class PricingColumns(BaseModel):
+    """Columnar batch payload: parallel arrays, scalars are broadcast."""
+
+    model_type: Union[str, List[str]]
+    solution_type: Union[str, List[str]]
+    option_type: Union[str, List[str]]
+    underlying_price: Union[float, List[float]]
+    strike_price: Union[float, List[float]]
+    yearsToExpiration: Union[float, List[float]]
+    risk_free_rate: Union[float, List[float]]
+    volatility: Union[float, List[float]]
+
+    # Heston parameters
+    kappa: Optional[Union[float, List[Optional[float]]]] = None
+    theta: Optional[Union[float, List[Optional[float]]]] = None
+    xi: Optional[Union[float, List[Optional[float]]]] = None
+    rho: Optional[Union[float, List[Optional[float]]]] = None
+    v0: Optional[Union[float, List[Optional[float]]]] = None
+
+    # Monte Carlo parameters
+    monte_carlo_simulations: Optional[Union[int, List[Optional[int]]]] = None
+    seed: Optional[Union[int, List[Optional[int]]]] = None
+    mc_workers: Optional[Union[int, List[Optional[int]]]] = None
+    sampler: Optional[Union[str, List[Optional[str]]]] = None
+    qmc_replications: Optional[Union[int, List[Optional[int]]]] = None
+    control_variate: Optional[Union[str, List[Optional[str]]]] = None
+    target_stderr: Optional[Union[float, List[Optional[float]]]] = None
+    mc_max_time: Optional[Union[float, List[Optional[float]]]] = None
+    mc_scheme: Optional[Union[str, List[Optional[str]]]] = None
+    mc_steps_per_year: Optional[Union[int, List[Optional[int]]]] = None
+    mc_greeks: Optional[Union[str, List[Optional[str]]]] = None
+
+    model_config = ConfigDict(protected_namespaces=())
+
+
+class BatchPricingRequest(BaseModel):
+    # Either a list of contracts or a columnar payload
+    contracts: Optional[List[PricingRequest]] = None
+    columns: Optional[PricingColumns] = None
+
+
+class BatchPricingResult(BaseModel):
+    count: int
+    price: List[Optional[float]]
+    methodology: List[Optional[str]]
+    error: List[Optional[str]]
+    calculation_time: float
+    model_config = ConfigDict(extra="allow")  # Greek columns when available
+
+
+class ImpliedVolatilityRequest(BaseModel):
+    """Columnar chain: parallel arrays, scalars are broadcast."""
+
+    option_type: Union[str, List[str]]
+    market_price: Union[float, List[float]]
+    underlying_price: Union[float, List[float]]
+    strike_price: Union[float, List[float]]
+    yearsToExpiration: Union[float, List[float]]
+    risk_free_rate: Union[float, List[float]]
+
+
+class ImpliedVolatilityResult(BaseModel):
+    count: int
+    implied_volatility: List[Optional[float]]  # None where no vol fits the price
+    converged: List[bool]
+    iterations: int
+    methodology: str
+    calculation_time: float
+
+
+class ProfilingSettings(BaseModel):
+    # Fraction of requests profiled (0 switches profiling off)
+    sample_rate: Optional[float] = None
+    # Profiles of sampled requests faster than this are dropped
+    min_seconds: Optional[float] = None
+
+
 class OptionData(BaseModel):
     symbol: str
     stock_price: float
@@ -53,6 +212,22 @@ class CalibrationRequest(BaseModel):
     underlying_price: float
     expiration: str
     risk_free_rate: float
+    method: str = "SLSQP"  # "SLSQP" or "least_squares" (analytic gradient)
+    use_cache: bool = True  # Warm-start from / reuse the last calibration
+
+
+class CalibrationJob(BaseModel):
+    symbol: str
+    expiration: str
+    underlying_price: Optional[float] = None  # Fetched when omitted
+    risk_free_rate: float = 0.0
+
+
+class BatchCalibrationRequest(BaseModel):
+    jobs: List[CalibrationJob]
+    method: str = "SLSQP"
+    use_cache: bool = True
+    max_workers: Optional[int] = None  # Jobs in flight at once (default: CPU workers)
 
 
 class CalibrationResult(BaseModel):
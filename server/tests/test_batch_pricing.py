@@ -0,0 +1,89 @@
+"""Error handling of the batch pricer: a bad contract only fails its own row."""
+
+import numpy as np
+import pytest
+
+from models.black_scholes import BlackScholes
+from models.heston import Heston
+from schemas import BatchPricingRequest
+from utils.batch_pricing import contracts_frame, price_batch
+
+HESTON_PARAMS = dict(kappa=2.0, theta=0.04, xi=0.5, rho=-0.7, v0=0.04)
+HESTON_ENGINES = {
+    "characteristicFunction": Heston.characteristic_function,
+    "fft": Heston.fft,
+}
+
+
+def contract(**fields):
+    base = dict(
+        model_type="blackScholes",
+        solution_type="closedForm",
+        option_type="call",
+        underlying_price=100.0,
+        strike_price=100.0,
+        yearsToExpiration=0.5,
+        risk_free_rate=0.03,
+        volatility=0.2,
+    )
+    return {**base, **fields}
+
+
+def heston_contract(solution_type, **fields):
+    return contract(
+        model_type="heston", solution_type=solution_type, **HESTON_PARAMS, **fields
+    )
+
+
+def price(contracts):
+    return price_batch(contracts_frame(BatchPricingRequest(contracts=contracts)))
+
+
+def test_bad_option_type_fails_only_its_row():
+    result = price(
+        [
+            contract(strike_price=95.0),
+            contract(option_type="cal"),
+            contract(option_type="put", strike_price=105.0),
+        ]
+    )
+    assert result["error"] == [None, "Option type must be 'call' or 'put'", None]
+    assert result["price"][1] is None
+    expected = BlackScholes.closed_form_batch(
+        ["call", "put"], 100.0, [95.0, 105.0], 0.5, 0.03, 0.2
+    )["price"]
+    np.testing.assert_allclose(
+        [result["price"][0], result["price"][2]], expected, rtol=1e-12
+    )
+
+
+@pytest.mark.parametrize("solution_type", ["characteristicFunction", "fft"])
+def test_missing_heston_parameter_fails_only_its_row(solution_type):
+    contracts = [
+        heston_contract(solution_type, strike_price=K) for K in (90.0, 100.0, 110.0)
+    ]
+    contracts[1]["kappa"] = None
+    result = price(contracts)
+
+    assert result["error"] == [None, "Missing Heston parameters", None]
+    assert result["price"][1] is None
+    for i, K in ((0, 90.0), (2, 110.0)):
+        engine = HESTON_ENGINES[solution_type]
+        expected = engine("call", 100.0, K, 0.5, 0.03, 0.2, **HESTON_PARAMS)
+        assert result["price"][i] == pytest.approx(expected["price"], abs=1e-6)
+
+
+def test_off_grid_strike_fails_only_its_row_of_the_fft_chain():
+    result = price(
+        [heston_contract("fft", strike_price=K) for K in (90.0, 1e-7, 110.0)]
+    )
+    assert result["error"] == [None, "Strike outside the FFT grid", None]
+    assert result["price"][0] is not None and result["price"][2] is not None
+
+
+def test_empty_batches_are_rejected():
+    with pytest.raises(ValueError):
+        contracts_frame(BatchPricingRequest(contracts=[]))
+    columns = {k: [] for k in contract()}
+    with pytest.raises(ValueError):
+        contracts_frame(BatchPricingRequest(columns=columns))
@@ -0,0 +1,88 @@
+"""
+The fixed-grid Heston pricers against a converged adaptive-quadrature
+reference of the same integrals (phi from 0 to 100, as in heston_call_price).
+"""
+
+import numpy as np
+import pytest
+from scipy.integrate import quad
+
+from utils.calibrateHeston import (
+    heston_call_prices_and_jacobian,
+    heston_call_prices_vectorized,
+    heston_characteristic_function,
+    heston_put_prices_vectorized,
+)
+
+TOLERANCE = 1e-6
+SPOT = 100.0
+# (low, high) of kappa, rho, volvol, theta, var0: the calibration bounds
+PARAM_BOUNDS = [(0.1, 10), (-0.95, 0.0), (0.01, 1.5), (0.001, 0.4), (0.001, 0.4)]
+
+
+def reference_call_price(S, K, T, r, kappa, rho, volvol, theta, var0, div):
+    """heston_call_price without the eps lower limit and with tight tolerances"""
+    P = []
+    for P1P2 in (1, 2):
+
+        def integrand(phi):
+            cf = heston_characteristic_function(
+                phi, S, K, T, r, kappa, rho, volvol, theta, var0, div, P1P2
+            )
+            return np.real(np.exp(-1j * phi * np.log(K)) * cf / (1j * phi))
+
+        integral = quad(integrand, 0.0, 100.0, limit=1000, epsabs=1e-13, epsrel=1e-13)
+        P.append(0.5 + integral[0] / np.pi)
+    return max(0.0, S * np.exp(-div * T) * P[0] - K * np.exp(-r * T) * P[1])
+
+
+def random_contracts(n, seed):
+    """(S, K, T, r, kappa, rho, volvol, theta, var0, div) columns"""
+    rng = np.random.default_rng(seed)
+    kappa, rho, volvol, theta, var0 = (
+        rng.uniform(lo, hi, n) for lo, hi in PARAM_BOUNDS
+    )
+    K = SPOT * rng.uniform(0.7, 1.3, n)
+    T = rng.uniform(0.02, 2.0, n)
+    r = rng.uniform(0.0, 0.06, n)
+    div = rng.uniform(0.0, 0.02, n)
+    return np.full(n, SPOT), K, T, r, kappa, rho, volvol, theta, var0, div
+
+
+@pytest.fixture(scope="module")
+def contracts():
+    columns = random_contracts(60, seed=0)
+    reference = np.array([reference_call_price(*c) for c in zip(*columns)])
+    return columns, reference
+
+
+def test_per_contract_parameters_match_reference(contracts):
+    # One (T, parameter) group per contract: the pointwise integrands
+    columns, reference = contracts
+    prices = heston_call_prices_vectorized(*columns)
+    np.testing.assert_allclose(prices, reference, rtol=0, atol=TOLERANCE)
+
+
+def test_chain_at_one_maturity_matches_reference():
+    # Strikes sharing (T, parameters) are priced from a cached kernel
+    K = np.linspace(70, 130, 25)
+    args = (SPOT, K, 1.5, 0.03, 1.2, -0.3, 1.4, 0.39, 0.007, 0.01)
+    reference = [reference_call_price(*args[:1], k, *args[2:]) for k in K]
+    prices = heston_call_prices_vectorized(*args)
+    np.testing.assert_allclose(prices, reference, rtol=0, atol=TOLERANCE)
+    # The same strikes one quote at a time
+    single = [heston_call_prices_vectorized(*args[:1], k, *args[2:])[0] for k in K]
+    np.testing.assert_allclose(single, reference, rtol=0, atol=TOLERANCE)
+
+
+def test_puts_follow_put_call_parity(contracts):
+    (S, K, T, r, *params, div), reference = contracts
+    puts = heston_put_prices_vectorized(S, K, T, r, *params, div)
+    expected = reference - S * np.exp(-div * T) + K * np.exp(-r * T)
+    np.testing.assert_allclose(puts, expected, rtol=0, atol=TOLERANCE)
+
+
+def test_jacobian_pricer_matches_reference(contracts):
+    columns, reference = contracts
+    prices, _ = heston_call_prices_and_jacobian(*columns)
+    np.testing.assert_allclose(prices, reference, rtol=0, atol=TOLERANCE)
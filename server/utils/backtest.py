@@ -0,0 +1,240 @@
+"""
+Historical Heston re-calibration over stored option-chain snapshots (see
+utils/snapshot_store.py).
+
+Every snapshot date of each symbol in the range is calibrated as of that
+day, to the listed expiration closest to `tenor_days` out. Consecutive
+days are chained, each starting from the previous day's fit; to use
+several processes, a symbol's dates are cut into contiguous segments that
+run in parallel, and only the first day of a segment starts cold. Output
+is one row per (symbol, date): parameters, fit errors and optimizer stats.
+
+    python -m utils.backtest --snapshots snapshots --symbols SPY QQQ
+                             --start 2024-01-02 --end 2024-12-31
+                             [--tenor-days 90] [--rate 0.04] [--method SLSQP]
+                             [--workers 4] --out params.csv
+"""
+
+import argparse
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from utils.calibrateHeston import calibrate_heston, load_calibration_chain
+from utils.calibration_cache import PARAM_NAMES
+from utils.market_data import market_data, set_provider
+from utils.snapshot_store import SnapshotProvider, SnapshotStore
+
+BACKTEST_TENOR_DAYS = 90
+BACKTEST_WORKERS = int(os.environ.get("BACKTEST_WORKERS", os.cpu_count() or 1))
+
+# Output columns; parameters use the API's names (xi, v0)
+BACKTEST_COLUMNS = [
+    "symbol",
+    "date",
+    "expiration",
+    "underlying_price",
+    "options",
+    "kappa",
+    "theta",
+    "xi",
+    "rho",
+    "v0",
+    "rmse",
+    "mse",
+    "success",
+    "warm_start",
+    "iterations",
+    "function_evaluations",
+    "optimization_time",
+    "error",
+]
+API_NAMES = {"volvol": "xi", "var0": "v0"}
+
+
+def target_expiration(expirations: Iterable[str], as_of: date, tenor_days: int):
+    """The listed expiration after `as_of` closest to `tenor_days` out"""
+    listed = [
+        (abs((d - as_of).days - tenor_days), d)
+        for d in pd.to_datetime(list(expirations)).date
+        if d > as_of
+    ]
+    if not listed:
+        raise ValueError(f"No expirations after {as_of}")
+    return min(listed)[1].isoformat()
+
+
+def calibrate_days(segment: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Calibrate consecutive snapshot dates of one symbol in order, each one
+    warm-started from the last successful fit. Never raises: a failed day
+    is a row with its error.
+    """
+    symbol = segment["symbol"]
+    store = SnapshotStore(segment["snapshots"])
+    previous_provider = market_data.provider
+    fit = None  # Last successful fit: the next day starts from it
+    rows = []
+    try:
+        for day in segment["dates"]:
+            as_of = date.fromisoformat(day)
+            row = {"symbol": symbol, "date": day}
+            try:
+                # The shared market-data cache serves this day's snapshot
+                set_provider(SnapshotProvider(store, as_of))
+                spot = market_data.spot(symbol)
+                expiration = target_expiration(
+                    market_data.expirations(symbol), as_of, segment["tenor_days"]
+                )
+                data = load_calibration_chain(symbol, expiration, spot, as_of=as_of)
+                row.update(expiration=expiration, underlying_price=spot)
+                row["options"] = len(data)
+                result = calibrate_heston(
+                    symbol,
+                    expiration,
+                    spot,
+                    segment["rate"],
+                    method=segment["method"],
+                    data=data,
+                    initial_params=fit,
+                )
+                result.pop("result", None)  # scipy OptimizeResult
+                if result["success"]:
+                    fit = {p: float(result[p]) for p in PARAM_NAMES}
+                for key, value in result.items():
+                    value = value.item() if isinstance(value, np.generic) else value
+                    row[API_NAMES.get(key, key)] = value
+            except Exception as e:
+                row.update(success=False, error=str(e))
+            rows.append(row)
+    finally:
+        set_provider(previous_provider)
+    return rows
+
+
+def split_segments(dates: List[str], segments: int) -> List[List[str]]:
+    """`dates` cut into at most `segments` contiguous, nearly equal runs"""
+    size = math.ceil(len(dates) / max(1, segments))
+    return [dates[i : i + size] for i in range(0, len(dates), size)]
+
+
+def run_backtest(
+    snapshots: str,
+    symbols: Iterable[str],
+    start=None,
+    end=None,
+    tenor_days: int = BACKTEST_TENOR_DAYS,
+    rate: float = 0.0,
+    method: str = "SLSQP",
+    workers: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Calibrate every snapshot date in [start, end] of each symbol; returns
+    BACKTEST_COLUMNS ordered by symbol and date.
+
+    Symbols are independent and run side by side; a symbol's dates are only
+    split into segments when there are fewer symbols than workers.
+    """
+    store = SnapshotStore(snapshots)
+    symbols = [s.upper() for s in symbols]
+    start = None if start is None else pd.Timestamp(start).date().isoformat()
+    end = None if end is None else pd.Timestamp(end).date().isoformat()
+    workers = max(1, workers or BACKTEST_WORKERS)
+    per_symbol = math.ceil(workers / max(1, len(symbols)))
+
+    segments = []
+    for symbol in symbols:
+        dates = [
+            d
+            for d in store.dates(symbol)
+            if (start is None or d >= start) and (end is None or d <= end)
+        ]
+        for run in split_segments(dates, per_symbol):
+            segments.append(
+                {
+                    "symbol": symbol,
+                    "dates": run,
+                    "snapshots": snapshots,
+                    "tenor_days": tenor_days,
+                    "rate": rate,
+                    "method": method,
+                }
+            )
+
+    rows = []
+    if segments:
+        with ProcessPoolExecutor(max_workers=min(workers, len(segments))) as pool:
+            futures = {pool.submit(calibrate_days, s): s for s in segments}
+            for future in as_completed(futures):
+                try:
+                    rows.extend(future.result())
+                except Exception as e:  # Worker process died
+                    segment = futures[future]
+                    rows.extend(
+                        {
+                            "symbol": segment["symbol"],
+                            "date": d,
+                            "success": False,
+                            "error": str(e),
+                        }
+                        for d in segment["dates"]
+                    )
+
+    frame = pd.DataFrame(rows).reindex(columns=BACKTEST_COLUMNS)
+    return frame.sort_values(["symbol", "date"], ignore_index=True)
+
+
+def write_results(frame: pd.DataFrame, path: str):
+    """CSV, or Parquet when the path ends in .parquet"""
+    if path.endswith(".parquet"):
+        frame.to_parquet(path, index=False)
+    else:
+        frame.to_csv(path, index=False)
+
+
+def summarize(frame: pd.DataFrame) -> pd.DataFrame:
+    """Days, failures and fit-error quantiles per symbol"""
+    succeeded = frame.success.fillna(False).astype(bool)
+    return (
+        frame.assign(failed=~succeeded)
+        .groupby("symbol")
+        .agg(
+            days=("date", "size"),
+            failed=("failed", "sum"),
+            median_rmse=("rmse", "median"),
+            max_rmse=("rmse", "max"),
+            median_iterations=("iterations", "median"),
+        )
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--snapshots", required=True, help="SnapshotStore directory")
+    parser.add_argument("--symbols", nargs="+", required=True)
+    parser.add_argument("--start", help="First date (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Last date (YYYY-MM-DD)")
+    parser.add_argument("--tenor-days", type=int, default=BACKTEST_TENOR_DAYS)
+    parser.add_argument("--rate", type=float, default=0.0, help="Risk-free rate")
+    parser.add_argument("--method", default="SLSQP")
+    parser.add_argument("--workers", type=int, default=BACKTEST_WORKERS)
+    parser.add_argument("--out", required=True, help=".csv or .parquet")
+    args = parser.parse_args()
+
+    results = run_backtest(
+        args.snapshots,
+        args.symbols,
+        args.start,
+        args.end,
+        args.tenor_days,
+        args.rate,
+        args.method,
+        args.workers,
+    )
+    write_results(results, args.out)
+    print(summarize(results).to_string())
@@ -0,0 +1,108 @@
+import os
+import time
+import numpy as np
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Any, Iterable, Iterator
+
+from utils.calibrateHeston import calibrate_heston
+from utils.calibration_cache import default_cache
+from utils.executors import ExecutorOverloaded
+from utils.fetch_data import get_spot_price
+from utils.metrics import absorb, call_with_metrics
+
+# Default pool size for bulk calibration, overridable per call
+CALIBRATION_WORKERS = int(os.environ.get("CALIBRATION_WORKERS", os.cpu_count() or 1))
+# Wait before retrying when a shared pool's backlog is full of other work
+CALIBRATION_RETRY_DELAY = 0.1  # seconds
+
+
+def _to_builtin(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def calibrate_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Calibrate one (symbol, expiration) job. Never raises: failures come back
+    as {"success": False, "error": ...} so one bad chain cannot kill a batch.
+    """
+    symbol, expiration = job["symbol"], job["expiration"]
+    try:
+        underlying_price = job.get("underlying_price") or get_spot_price(symbol)
+        result = calibrate_heston(
+            symbol,
+            expiration,
+            underlying_price,
+            job.get("risk_free_rate", 0.0),
+            method=job.get("method", "SLSQP"),
+            cache=default_cache() if job.get("use_cache") else None,
+        )
+        result.pop("result", None)  # scipy OptimizeResult, not serializable
+        result["underlying_price"] = underlying_price
+    except Exception as e:
+        result = {"success": False, "error": str(e)}
+
+    result = {k: _to_builtin(v) for k, v in result.items()}
+    return {"symbol": symbol, "expiration": expiration, **result}
+
+
+def _failed(job: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+    return {
+        "symbol": job["symbol"],
+        "expiration": job["expiration"],
+        "success": False,
+        "error": str(error),
+    }
+
+
+def calibrate_many(
+    jobs: Iterable[Dict[str, Any]], max_workers: int = None, executor=None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Calibrate many (symbol, expiration) jobs on a process pool, yielding each
+    result as soon as it finishes (not in submission order).
+
+    Uses `executor` (e.g. the API's shared BoundedExecutor) when given,
+    otherwise a private pool of `max_workers` processes. At most
+    `max_workers` jobs (by default the pool's worker count) are submitted
+    at a time, the next ones as earlier ones finish, so a batch of any size
+    fits a bounded backlog; while that backlog is full of other work, the
+    batch waits for a slot instead of failing.
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return
+
+    if executor is None:
+        workers = max(1, min(max_workers or CALIBRATION_WORKERS, len(jobs)))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            yield from calibrate_many(jobs, workers, executor=pool)
+        return
+
+    window = max(1, max_workers or getattr(executor, "workers", CALIBRATION_WORKERS))
+    queued = iter(jobs)
+    job = next(queued, None)
+    futures = {}
+    while job is not None or futures:
+        while job is not None and len(futures) < window:
+            try:
+                future = executor.submit(call_with_metrics, calibrate_job, (job,), {})
+            except ExecutorOverloaded:
+                break
+            except Exception as e:  # e.g. the pool was shut down
+                yield _failed(job, e)
+            else:
+                futures[future] = job
+            job = next(queued, None)
+
+        if not futures:
+            time.sleep(CALIBRATION_RETRY_DELAY)
+            continue
+
+        done, _ = wait(futures, return_when=FIRST_COMPLETED)
+        for future in done:
+            finished = futures.pop(future)
+            try:
+                yield absorb(future.result())
+            except Exception as e:
+                # Worker process died (e.g. BrokenProcessPool)
+                yield _failed(finished, e)
@@ -0,0 +1,245 @@
+import numpy as np
+import pandas as pd
+import time
+from typing import Dict, Any
+
+from models.black_scholes import BlackScholes
+from models.heston import Heston
+from schemas import MC_OPTION_FIELDS
+
+# Columns returned by the batch endpoint besides price/methodology/error
+BATCH_OUTPUT_FIELDS = [
+    "d1",
+    "d2",
+    "delta",
+    "gamma",
+    "theta",
+    "vega",
+    "standard_error",
+]
+
+HESTON_FIELDS = ["kappa", "theta", "xi", "rho", "v0"]
+
+
+def contracts_frame(request) -> pd.DataFrame:
+    """Build one DataFrame of contracts from a BatchPricingRequest"""
+    if (request.contracts is None) == (request.columns is None):
+        raise ValueError("Provide exactly one of 'contracts' or 'columns'")
+
+    if request.contracts is not None:
+        frame = pd.DataFrame([c.model_dump() for c in request.contracts])
+    else:
+        columns = request.columns.model_dump()
+        lengths = {len(v) for v in columns.values() if isinstance(v, list)}
+        if len(lengths) > 1:
+            raise ValueError("All column arrays must have the same length")
+        if not lengths:
+            # Only scalars given: a single contract
+            columns = {k: [v] for k, v in columns.items()}
+        frame = pd.DataFrame(columns)
+
+    if frame.empty:
+        raise ValueError("The batch has no contracts")
+    return frame.reset_index(drop=True)
+
+
+def _base_params(row) -> dict:
+    return {
+        "option_type": row.option_type,
+        "S": row.underlying_price,
+        "K": row.strike_price,
+        "T": row.yearsToExpiration,
+        "r": row.risk_free_rate,
+        "sigma": row.volatility,
+    }
+
+
+def mc_options(contract) -> dict:
+    """
+    Monte Carlo engine keywords set on a PricingRequest or contract row
+    (columnar batches lack some of the fields)
+    """
+    options = {}
+    for field, keyword in MC_OPTION_FIELDS.items():
+        value = getattr(contract, field, None)
+        if value is not None and not pd.isna(value):
+            if not isinstance(value, str):
+                # Integer columns come back as floats when they contain gaps
+                value = int(value) if float(value).is_integer() else float(value)
+            options[keyword] = value
+    return options
+
+
+def _price_single(model_type: str, solution_type: str, row) -> dict:
+    """Scalar fallback for engines without a vectorized entry point"""
+    params = _base_params(row)
+
+    if model_type == "blackScholes":
+        if solution_type == "closedForm":
+            return BlackScholes.closed_form(**params)
+        if solution_type == "monteCarlo":
+            return BlackScholes.monte_carlo(**params, **mc_options(row))
+
+    elif model_type == "heston":
+        params.update({f: getattr(row, f) for f in HESTON_FIELDS})
+        if solution_type == "characteristicFunction":
+            return Heston.characteristic_function(**params)
+        if solution_type == "fft":
+            return Heston.fft(**params)
+        if solution_type == "monteCarlo":
+            return Heston.monte_carlo(**params, **mc_options(row))
+
+    raise ValueError(f"Unsupported model/solution: {model_type}/{solution_type}")
+
+
+# (model, solution) pairs priced by a vectorized engine
+VECTORIZED_ENGINES = {
+    ("blackScholes", "closedForm"),
+    ("heston", "characteristicFunction"),
+    ("heston", "fft"),
+}
+
+
+def _row_errors(model_type: str, group: pd.DataFrame) -> pd.Series:
+    """
+    Per-contract input errors (None where valid) for the vectorized engines,
+    which would otherwise fail or skip the whole group on one bad row
+    """
+    errors = pd.Series(None, index=group.index, dtype=object)
+    flags = group["option_type"].astype(str).str.lower()
+    errors[~flags.isin(["call", "put"])] = "Option type must be 'call' or 'put'"
+    if model_type == "heston":
+        missing = group.reindex(columns=HESTON_FIELDS).isna().any(axis=1)
+        errors[missing & errors.isna()] = "Missing Heston parameters"
+    return errors
+
+
+def _fft_chain(option_type: str, S, T, r, params: dict, chain: pd.DataFrame):
+    """
+    Prices and errors of one FFT chain side; when the chain fails (e.g. a
+    strike off the FFT grid), strikes are priced one by one so only the
+    failing ones carry the error
+    """
+    strikes = chain["strike_price"].values
+    try:
+        return Heston.fft_chain(option_type, S, strikes, T, r, **params), None
+    except ValueError:
+        pass
+
+    prices = np.full(len(strikes), np.nan)
+    errors = [None] * len(strikes)
+    for i, K in enumerate(strikes):
+        try:
+            prices[i] = Heston.fft_chain(option_type, S, [K], T, r, **params)[0]
+        except ValueError as e:
+            errors[i] = str(e)
+    return prices, errors
+
+
+def _price_vectorized(model_type: str, solution_type: str, group: pd.DataFrame):
+    """Price a group of valid contracts with its vectorized engine"""
+    if model_type == "blackScholes" and solution_type == "closedForm":
+        result = BlackScholes.closed_form_frame(group)
+        result["methodology"] = "Black-Scholes Closed-Form (Vectorized)"
+        return result
+
+    if model_type == "heston" and solution_type == "characteristicFunction":
+        result = Heston.characteristic_function_batch(
+            group["option_type"].values,
+            group["underlying_price"].values,
+            group["strike_price"].values,
+            group["yearsToExpiration"].values,
+            group["risk_free_rate"].values,
+            group["volatility"].values,
+            **{f: group[f].astype(float).values for f in HESTON_FIELDS},
+        )
+        return pd.DataFrame(
+            {"price": result["price"], "methodology": result["methodology"]},
+            index=group.index,
+        )
+
+    # FFT: one transform per (spot, maturity, rate, parameters) chain
+    prices = pd.Series(np.nan, index=group.index)
+    errors = pd.Series(None, index=group.index, dtype=object)
+    chain_keys = ["underlying_price", "yearsToExpiration", "risk_free_rate"]
+    for key, chain in group.groupby(
+        chain_keys + HESTON_FIELDS, sort=False, dropna=False
+    ):
+        S, T, r = key[:3]
+        params = dict(zip(HESTON_FIELDS, key[3:]))
+        for option_type, side in chain.groupby("option_type", sort=False):
+            prices[side.index], side_errors = _fft_chain(
+                option_type, S, T, r, params, side
+            )
+            if side_errors is not None:
+                errors[side.index] = side_errors
+    return pd.DataFrame(
+        {"price": prices, "methodology": "Heston Carr-Madan FFT", "error": errors},
+        index=group.index,
+    )
+
+
+def _price_group(model_type: str, solution_type: str, group: pd.DataFrame) -> dict:
+    """
+    Price one (model, solution) group, vectorized when an engine exists.
+    A bad contract only fails its own row.
+    """
+    if (model_type, solution_type) in VECTORIZED_ENGINES:
+        errors = _row_errors(model_type, group)
+        valid = group[errors.isna()]
+        if len(valid):
+            result = _price_vectorized(model_type, solution_type, valid)
+        else:
+            result = pd.DataFrame(index=valid.index)
+        result = result.reindex(group.index)
+        if "error" in result:
+            errors = errors.where(errors.notna(), result["error"])
+        result["error"] = errors
+        return result
+
+    rows = []
+    for row in group.itertuples():
+        try:
+            rows.append(_price_single(model_type, solution_type, row))
+        except (ValueError, TypeError) as e:
+            rows.append({"price": np.nan, "error": str(e)})
+    return pd.DataFrame(rows, index=group.index)
+
+
+def price_batch(contracts: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Price a frame of contracts grouped by (model_type, solution_type) and
+    return columnar results in the original contract order.
+    """
+    start_time = time.perf_counter()
+    n = len(contracts)
+
+    out = pd.DataFrame(index=contracts.index)
+    out["price"] = np.nan
+    out["methodology"] = None
+    out["error"] = None
+    for field in BATCH_OUTPUT_FIELDS:
+        out[field] = np.nan
+
+    for (model_type, solution_type), group in contracts.groupby(
+        ["model_type", "solution_type"], sort=False
+    ):
+        try:
+            result = _price_group(model_type, solution_type, group)
+        except (ValueError, TypeError) as e:
+            out.loc[group.index, "error"] = str(e)
+            continue
+        for column in out.columns:
+            if column in result:
+                out.loc[group.index, column] = result[column].values
+
+    elapsed_time = time.perf_counter() - start_time
+
+    response = {"count": n, "calculation_time": round(elapsed_time * 1000, 5)}
+    for column in out.columns:
+        values = out[column]
+        # Drop Greek columns no engine in this batch produced
+        if column in BATCH_OUTPUT_FIELDS and values.isna().all():
+            continue
+        response[column] = [None if pd.isna(v) else v for v in values.tolist()]
+    return response
@@ -1,36 +1,43 @@
+import logging
 import numpy as np
 import pandas as pd
 import time
 from datetime import datetime, timezone
+from functools import lru_cache
 from scipy.optimize import minimize, least_squares
 import yfinance as yf
 from scipy.integrate import quad
+from scipy.interpolate import CubicSpline
 
 from utils.fetch_data import get_option_calibration_data, get_data_withoutR
+from utils.calibration_cache import PARAM_NAMES
+from utils.metrics import observe, timed
+
+logger = logging.getLogger(__name__)
 
 
 # --- Heston Pricing Functions ---
 def heston_characteristic_function(
     phi, S, K, T, r, kappa, rho, volvol, theta, var0, div, P1P2
 ):
+    """
+    Heston characteristic functions f1/f2 in the "little trap" form of
+    Albrecher et al. (2007): same values as Heston (1993) but uses exp(-d*T),
+    so it neither overflows nor crosses the complex-log branch cut for long
+    maturities or large phi.
+    """
     x = np.log(S)
     a = kappa * theta
     u = 0.5 if P1P2 == 1 else -0.5
     b = kappa - rho * volvol if P1P2 == 1 else kappa
-    d = np.sqrt(
-        (rho * volvol * phi * 1j - b) ** 2 - volvol**2 * (2 * u * phi * 1j - phi**2)
-    )
-    g = (b - rho * volvol * phi * 1j + d) / (b - rho * volvol * phi * 1j - d)
+    beta = b - rho * volvol * phi * 1j
+    d = np.sqrt(beta**2 - volvol**2 * (2 * u * phi * 1j - phi**2))
+    g = (beta - d) / (beta + d)
+    exp_dT = np.exp(-d * T)
     C = (r - div) * phi * 1j * T + (a / volvol**2) * (
-        (b - rho * volvol * phi * 1j + d) * T
-        - 2 * np.log((1 - g * np.exp(d * T)) / (1 - g))
-    )
-    D = (
-        (b - rho * volvol * phi * 1j + d)
-        / volvol**2
-        * (1 - np.exp(d * T))
-        / (1 - g * np.exp(d * T))
+        (beta - d) * T - 2 * np.log((1 - g * exp_dT) / (1 - g))
     )
+    D = (beta - d) / volvol**2 * (1 - exp_dT) / (1 - g * exp_dT)
     return np.exp(C + D * var0 + 1j * phi * x)
 
 
@@ -61,13 +68,284 @@ def heston_put_price(S, K, T, r, kappa, rho, volvol, theta, var0, div):
     return PutValue
 
 
+@lru_cache(maxsize=16)
+def gauss_legendre_grid(n_panels=8, n_points=16, upper=100.0):
+    """
+    Composite Gauss-Legendre nodes and weights on [0, upper]. Panels after
+    [0, upper / 100] grow geometrically: the integrands vary fastest near
+    phi = 0 (low variance, long maturities) and flatten out further along.
+    """
+    x, w = np.polynomial.legendre.leggauss(n_points)
+    edges = np.r_[0.0, np.geomspace(upper / 100, upper, n_panels)]
+    a, b = edges[:-1, None], edges[1:, None]
+    nodes = (0.5 * (b - a) * x + 0.5 * (a + b)).ravel()
+    weights = (0.5 * (b - a) * w).ravel()
+    nodes.flags.writeable = False
+    weights.flags.writeable = False
+    return nodes, weights
+
+
+class HestonCFKernel:
+    """
+    Strike-independent part of the Heston P1/P2 integrands for one maturity
+    and parameter set, on the quadrature grid.
+
+    With ln F = ln S + (r - div) T, the characteristic functions factor as
+    f_j(phi) = h_j(phi) exp(i phi ln F): d, g, exp(-d T), the log term and
+    D (little trap form, see heston_characteristic_function) only enter
+    h_j. This precomputes w h_j / (i phi) once, so the probabilities for
+    any set of strikes are two real matrix products with cos / sin of
+    phi ln(F / K).
+    """
+
+    def __init__(self, T, kappa, rho, volvol, theta, var0, phi, weights):
+        self.T = T
+        self.phi = phi
+        terms = []
+        for P1P2 in (1, 2):
+            # ln S = 0 and r = div = 0 leave exactly h_j
+            h = heston_characteristic_function(
+                phi, 1.0, None, T, 0.0, kappa, rho, volvol, theta, var0, 0.0, P1P2
+            )
+            terms.append(weights * h / (1j * phi))
+        terms = np.array(terms)
+        self.real = np.ascontiguousarray(terms.real)
+        self.imag = np.ascontiguousarray(terms.imag)
+        for a in (self.real, self.imag):
+            a.flags.writeable = False
+
+    def probabilities(self, log_moneyness):
+        """P1 and P2 (each shaped like log_moneyness = ln(F / K))"""
+        angle = np.multiply.outer(self.phi, np.atleast_1d(log_moneyness))
+        # Re(k e^{i a}) = Re(k) cos(a) - Im(k) sin(a)
+        integrals = self.real @ np.cos(angle) - self.imag @ np.sin(angle)
+        return 0.5 + integrals / np.pi
+
+    def call_prices(self, S, K, r, div):
+        """Call prices for arrays of S, K, r, div at this kernel's maturity"""
+        log_forward = np.log(S) + (r - div) * self.T
+        P1, P2 = self.probabilities(log_forward - np.log(K))
+        return S * np.exp(-div * self.T) * P1 - K * np.exp(-r * self.T) * P2
+
+
+HESTON_CF_CACHE_SIZE = 256
+# Groups of fewer contracts are priced pointwise, but only when a batch has
+# more than HESTON_CF_MAX_SMALL_GROUPS of them (e.g. per-contract parameters):
+# a few kernels cost no more than the pointwise integrands and stay cached
+HESTON_CF_MIN_GROUP_SIZE = 4
+HESTON_CF_MAX_SMALL_GROUPS = 16
+
+
+@lru_cache(maxsize=HESTON_CF_CACHE_SIZE)
+def heston_cf_kernel(T, kappa, rho, volvol, theta, var0, n_panels=8, n_points=16):
+    """HestonCFKernel for (T, parameters), kept in an LRU across calls"""
+    phi, weights = gauss_legendre_grid(n_panels, n_points)
+    return HestonCFKernel(T, kappa, rho, volvol, theta, var0, phi, weights)
+
+
+@timed("cf_integration")
+def heston_call_prices_vectorized(
+    S, K, T, r, kappa, rho, volvol, theta, var0, div, chunk_size=4096
+):
+    """
+    Heston call prices for whole arrays of contracts on a fixed quadrature grid.
+
+    Same integrals as heston_call_price. Contracts are grouped by maturity
+    and parameters, each group is priced from its cached HestonCFKernel,
+    so the characteristic function is evaluated once per (node, group)
+    rather than once per (node, contract). All arguments broadcast against
+    each other; groups are processed in chunks of strikes to bound memory.
+    """
+    args = tuple(
+        np.atleast_1d(a).astype(float)
+        for a in np.broadcast_arrays(S, K, T, r, kappa, rho, volvol, theta, var0, div)
+    )
+    S, K, T, r, kappa, rho, volvol, theta, var0, div = args
+    keys = np.stack([T, kappa, rho, volvol, theta, var0], axis=1)
+    if S.size and (keys == keys[0]).all():
+        # One maturity and parameter set (e.g. a single quote): skip the sort
+        groups, inverse = keys[:1], np.zeros(S.size, dtype=np.intp)
+    else:
+        groups, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+    small = np.bincount(inverse) < HESTON_CF_MIN_GROUP_SIZE
+    if small.sum() <= HESTON_CF_MAX_SMALL_GROUPS:
+        small[:] = False
+
+    prices = np.empty(S.shape)
+    pointwise = small[inverse]
+    if pointwise.any():
+        # Building one kernel per few contracts would cost more than it saves
+        prices[pointwise] = _heston_call_prices_pointwise(
+            *(a[pointwise] for a in args), chunk_size
+        )
+    for group in np.flatnonzero(~small):
+        kernel = heston_cf_kernel(*(float(v) for v in groups[group]))
+        members = np.flatnonzero(inverse == group)
+        for start in range(0, members.size, chunk_size):
+            c = members[start : start + chunk_size]
+            prices[c] = kernel.call_prices(S[c], K[c], r[c], div[c])
+
+    return np.maximum(0.0, prices)
+
+
+def _heston_call_prices_pointwise(
+    S, K, T, r, kappa, rho, volvol, theta, var0, div, chunk_size
+):
+    """
+    heston_call_prices_vectorized without grouping: the characteristic
+    function is evaluated once per (node, contract) with NumPy broadcasting
+    """
+    phi, weights = gauss_legendre_grid()
+    phi = phi[:, None]
+
+    prices = np.empty(S.shape)
+    for start in range(0, S.size, chunk_size):
+        c = slice(start, start + chunk_size)
+        args = tuple(a[c] for a in (S, K, T, r, kappa, rho, volvol, theta, var0, div))
+        # Strike kernel shared by the P1 and P2 integrands
+        kernel = np.exp(-1j * phi * np.log(K[c])) / (1j * phi)
+        cf1 = heston_characteristic_function(phi, *args, 1)
+        cf2 = heston_characteristic_function(phi, *args, 2)
+        P1 = 0.5 + (1 / np.pi) * (weights @ np.real(kernel * cf1))
+        P2 = 0.5 + (1 / np.pi) * (weights @ np.real(kernel * cf2))
+        prices[c] = (
+            S[c] * np.exp(-div[c] * T[c]) * P1 - K[c] * np.exp(-r[c] * T[c]) * P2
+        )
+
+    return np.maximum(0.0, prices)
+
+
+def heston_put_prices_vectorized(S, K, T, r, kappa, rho, volvol, theta, var0, div):
+    """Vectorized put prices using put-call parity"""
+    S, K, T, r, div = (np.asarray(a, dtype=float) for a in (S, K, T, r, div))
+    calls = heston_call_prices_vectorized(
+        S, K, T, r, kappa, rho, volvol, theta, var0, div
+    )
+    return calls - S * np.exp(-div * T) + K * np.exp(-r * T)
+
+
+def heston_log_cf_gradient(phi, T, kappa, rho, volvol, theta, var0, P1P2):
+    """
+    Derivatives of log f1/f2 (little trap form) with respect to
+    (kappa, rho, volvol, theta, var0), by the chain rule through beta, d, g.
+    """
+    u = 0.5 if P1P2 == 1 else -0.5
+    delta = 1.0 if P1P2 == 1 else 0.0
+    q = phi**2 - 2 * u * phi * 1j
+    beta = kappa - rho * volvol * (delta + phi * 1j)
+    d = np.sqrt(beta**2 + volvol**2 * q)
+    g = (beta - d) / (beta + d)
+    e = np.exp(-d * T)
+    A = kappa * theta / volvol**2
+    L = np.log((1 - g * e) / (1 - g))
+    H = (beta - d) / volvol**2
+    R = (1 - e) / (1 - g * e)
+    D = H * R
+
+    zero = np.zeros_like(beta)
+    # d(beta)/dp, d(volvol)/dp and d(A)/dp for p in the calibration order
+    dbeta = [1.0 + zero, -volvol * (delta + phi * 1j), -rho * (delta + phi * 1j)]
+    dbeta += [zero, zero]
+    dvolvol = [0.0, 0.0, 1.0, 0.0, 0.0]
+    dA = [theta / volvol**2, 0.0, -2 * kappa * theta / volvol**3, kappa / volvol**2]
+    dA += [0.0]
+
+    gradients = []
+    for i in range(5):
+        dd = (beta * dbeta[i] + volvol * dvolvol[i] * q) / d
+        dg = 2 * (d * dbeta[i] - beta * dd) / (beta + d) ** 2
+        de = -T * dd * e
+        dL = -(dg * e + g * de) / (1 - g * e) + dg / (1 - g)
+        dC = dA[i] * ((beta - d) * T - 2 * L) + A * ((dbeta[i] - dd) * T - 2 * dL)
+        dH = (dbeta[i] - dd) / volvol**2 - 2 * (beta - d) * dvolvol[i] / volvol**3
+        dR = (-de * (1 - g * e) + (1 - e) * (dg * e + g * de)) / (1 - g * e) ** 2
+        gradients.append(dC + (dH * R + H * dR) * var0 + (D if i == 4 else 0.0))
+    return gradients
+
+
+@timed("cf_integration")
+def heston_call_prices_and_jacobian(S, K, T, r, kappa, rho, volvol, theta, var0, div):
+    """
+    Vectorized Heston call prices and their analytic Jacobian with respect to
+    (kappa, rho, volvol, theta, var0), on the same quadrature grid as
+    heston_call_prices_vectorized. Returns (prices, jacobian of shape (n, 5)).
+    """
+    S, K, T, r, div = (
+        np.atleast_1d(a).astype(float) for a in np.broadcast_arrays(S, K, T, r, div)
+    )
+    phi, weights = gauss_legendre_grid()
+    phi = phi[:, None]
+    kernel = np.exp(-1j * phi * np.log(K)) / (1j * phi)
+
+    fwd_S = S * np.exp(-div * T)
+    disc_K = K * np.exp(-r * T)
+    prices = np.zeros(S.shape)
+    jacobian = np.zeros(S.shape + (5,))
+    for P1P2, leg in ((1, fwd_S), (2, -disc_K)):
+        integrand = kernel * heston_characteristic_function(
+            phi, S, K, T, r, kappa, rho, volvol, theta, var0, div, P1P2
+        )
+        prob = 0.5 + (1 / np.pi) * (weights @ np.real(integrand))
+        prices += leg * prob
+        grads = heston_log_cf_gradient(phi, T, kappa, rho, volvol, theta, var0, P1P2)
+        for i, grad in enumerate(grads):
+            jacobian[:, i] += leg / np.pi * (weights @ np.real(integrand * grad))
+
+    return np.maximum(0.0, prices), jacobian
+
+
+def heston_fft_call_grid(
+    S, T, r, kappa, rho, volvol, theta, var0, div, N=4096, eta=0.25, alpha=1.5
+):
+    """
+    Carr-Madan (1999) FFT: call prices on a log-strike grid centred on log(S)
+    for a single maturity, in O(N log N).
+
+    Returns (strikes, prices). The grid spacing in log-strike is 2*pi/(N*eta).
+    """
+    v = eta * np.arange(N)
+    lam = 2 * np.pi / (N * eta)
+    b = 0.5 * N * lam
+    log_strikes = np.log(S) - b + lam * np.arange(N)
+
+    # P2 branch is the risk-neutral characteristic function of log(S_T)
+    cf = heston_characteristic_function(
+        v - (alpha + 1) * 1j, S, None, T, r, kappa, rho, volvol, theta, var0, div, 2
+    )
+    psi = np.exp(-r * T) * cf / (alpha**2 + alpha - v**2 + 1j * (2 * alpha + 1) * v)
+
+    # Simpson weights
+    simpson = 3 + (-1) ** (np.arange(N) + 1)
+    simpson[0] = 1
+    x = np.exp(1j * v * (b - np.log(S))) * psi * eta * simpson / 3
+
+    prices = np.exp(-alpha * log_strikes) / np.pi * np.real(np.fft.fft(x))
+    return np.exp(log_strikes), np.maximum(prices, 0.0)
+
+
+@timed("cf_fft")
+def heston_fft_call_prices(S, K, T, r, kappa, rho, volvol, theta, var0, div, **fft):
+    """Call prices for arbitrary strikes, interpolated off the FFT grid"""
+    grid_strikes, grid_prices = heston_fft_call_grid(
+        S, T, r, kappa, rho, volvol, theta, var0, div, **fft
+    )
+    log_K = np.log(np.atleast_1d(np.asarray(K, dtype=float)))
+    log_grid = np.log(grid_strikes)
+    if log_K.min() < log_grid[0] or log_K.max() > log_grid[-1]:
+        raise ValueError("Strike outside the FFT grid")
+
+    # Only spline the part of the grid that brackets the requested strikes
+    lo = max(np.searchsorted(log_grid, log_K.min()) - 4, 0)
+    hi = min(np.searchsorted(log_grid, log_K.max()) + 4, len(log_grid))
+    spline = CubicSpline(log_grid[lo:hi], grid_prices[lo:hi])
+    return np.maximum(spline(log_K), 0.0)
+
+
 def heston_prices_parallel(params, Spots, Strikes, Maturities, Rates, div):
     kappa, rho, volvol, theta, var0 = params
-    return np.array(
-        [
-            heston_call_price(S, K, T, r, kappa, rho, volvol, theta, var0, div)
-            for S, K, T, r in zip(Spots, Strikes, Maturities, Rates)
-        ]
+    return heston_call_prices_vectorized(
+        Spots, Strikes, Maturities, Rates, kappa, rho, volvol, theta, var0, div
     )
 
 
@@ -147,18 +425,101 @@ def Feller(x):
     return 2 * kappa * theta - volvol**2
 
 
+def least_squares_calibration(
+    init, bounds, Spots, Maturities, Rates, Strikes, MarketP, div
+):
+    """
+    Fit Heston parameters with scipy's least_squares using the analytic
+    Jacobian of model prices instead of finite differences.
+
+    Uses the bounded trust-region reflective solver: MINPACK's "lm" does not
+    accept bounds, and trf reduces to a Levenberg-Marquardt style step on
+    problems of this size.
+    """
+    mask = np.isfinite(MarketP) & (MarketP > 0)
+    S, T, r, K, Pmkt = (
+        Spots[mask],
+        Maturities[mask],
+        Rates[mask],
+        Strikes[mask],
+        MarketP[mask],
+    )
+
+    # least_squares asks for residuals and Jacobian at the same point
+    # separately; both come out of one pass over the quadrature grid
+    cache = {}
+
+    def evaluate(params):
+        key = tuple(params)
+        if key not in cache:
+            cache.clear()
+            prices, jacobian = heston_call_prices_and_jacobian(S, K, T, r, *params, div)
+            cache[key] = (prices - Pmkt, jacobian)
+        return cache[key]
+
+    lower, upper = np.array(bounds, dtype=float).T
+    x0 = np.clip(init, lower, upper)
+    return least_squares(
+        lambda x: evaluate(x)[0],
+        x0,
+        jac=lambda x: evaluate(x)[1],
+        bounds=(lower, upper),
+        method="trf",
+        x_scale="jac",
+        max_nfev=500,
+    )
+
+
+CALIBRATION_METHODS = ("SLSQP", "least_squares")
+
+
+def load_calibration_chain(symbol: str, expiration: str, underlying_price, as_of=None):
+    """Option chain around `expiration` used by calibrate_heston, as of a date"""
+    return get_data_withoutR(
+        symbol,
+        expiration,
+        underlying_price,
+        max_main=5,
+        max_side=3,
+        nside=2,
+        as_of=as_of,
+    )
+
+
 def calibrate_heston(
-    symbol: str, expiration: str, underlying_price, risk_free_rate, div=0.0
+    symbol: str,
+    expiration: str,
+    underlying_price,
+    risk_free_rate,
+    div=0.0,
+    method="SLSQP",
+    cache=None,
+    data=None,
+    initial_params=None,
 ):
+    """
+    Calibrate Heston to the option chain around `expiration`.
+
+    With a CalibrationCache, a previous fit for (symbol, expiration) is used as
+    the starting point, or returned directly when the market has barely moved.
+    Pass `data` (from load_calibration_chain) to skip fetching the chain here,
+    and `initial_params` (PARAM_NAMES -> value, e.g. a previous day's fit) to
+    start from there rather than from the chain's implied volatility.
+    """
+    if method not in CALIBRATION_METHODS:
+        return {"success": False, "error": f"Unknown calibration method: {method}"}
+
     t0 = time.time()
-    data = get_data_withoutR(
-        symbol, expiration, underlying_price, max_main=5, max_side=3, nside=2
-    )
+    if data is None:
+        with timed("calibration_load"):
+            data = load_calibration_chain(symbol, expiration, underlying_price)
 
     if data.empty:
         return {"success": False, "error": "No data found"}
 
-    print(f"Data loaded in {time.time() - t0:.2f} seconds | {len(data)} options used")
+    logger.info(
+        "Data loaded in %.2f seconds | %d options used", time.time() - t0, len(data)
+    )
 
     Strikes = data.strike.values
     Maturities = data.maturity.values
@@ -169,29 +530,68 @@ def calibrate_heston(
     avg_iv = np.mean(data.impliedVolatility)
     var0 = avg_iv**2
     init = [1.5, -0.7, 0.6 * avg_iv, var0, var0]
+    if initial_params is not None:
+        init = [initial_params[p] for p in PARAM_NAMES]
     bounds = [(0.1, 10), (-0.95, 0.0), (0.01, 1.5), (0.001, 0.4), (0.001, 0.4)]
     cons = {"type": "ineq", "fun": Feller}
 
+    cached = cache.get(symbol, expiration) if cache is not None else None
+    if cached is not None:
+        init = [cached["params"][p] for p in PARAM_NAMES]
+        modelP = heston_prices_parallel(init, Spots, Strikes, Maturities, Rates, div)
+        mse = np.mean((modelP - MarketP) ** 2)
+        if cache.is_reusable(cached, underlying_price, np.sqrt(mse)):
+            return {
+                "success": True,
+                "mse": mse,
+                "rmse": np.sqrt(mse),
+                **{p: round(v, 6) for p, v in zip(PARAM_NAMES, init)},
+                "optimization_time": 0.0,
+                "method": method,
+                "iterations": 0,
+                "function_evaluations": 1,
+                "cached": True,
+                "warm_start": False,
+            }
+
     t1 = time.time()
-    result = minimize(
-        OptFunctionFast,
-        init,
-        args=(Spots, Maturities, Rates, Strikes, MarketP, div, True),
-        method="SLSQP",
-        bounds=bounds,
-        constraints=cons,
-        options={"maxiter": 500, "disp": False},
-    )
+    with timed("optimizer", method=method):
+        if method == "least_squares":
+            result = least_squares_calibration(
+                init, bounds, Spots, Maturities, Rates, Strikes, MarketP, div
+            )
+            iterations = result.njev
+        else:
+            result = minimize(
+                OptFunctionFast,
+                init,
+                args=(Spots, Maturities, Rates, Strikes, MarketP, div, True),
+                method="SLSQP",
+                bounds=bounds,
+                constraints=cons,
+                options={"maxiter": 500, "disp": False},
+            )
+            iterations = result.nit
     elapsed = time.time() - t1
+    observe("options_optimizer_iterations", iterations, method=method)
 
     xopt = result.x
     modelP = heston_prices_parallel(xopt, Spots, Strikes, Maturities, Rates, div)
     mse = np.mean((modelP - MarketP) ** 2)
     rmse = np.sqrt(mse)
 
-    print(result)
-    print(f"Calibration time: {elapsed:.2f}s | MSE: {mse:.6f}")
-    print(f"Feller condition: {Feller(xopt):.8f} > 0")
+    logger.debug("Optimizer result: %s", result)
+    logger.info(
+        "Calibration time: %.2fs | MSE: %.6f | Feller condition: %.8f > 0",
+        elapsed,
+        mse,
+        Feller(xopt),
+    )
+
+    if cache is not None and result.success:
+        cache.put(
+            symbol, expiration, dict(zip(PARAM_NAMES, xopt)), underlying_price, rmse
+        )
 
     return {
         "result": result,
@@ -204,6 +604,11 @@ def calibrate_heston(
         "theta": round(xopt[3], 6),
         "var0": round(xopt[4], 6),
         "optimization_time": elapsed,
+        "method": method,
+        "iterations": int(iterations),
+        "function_evaluations": int(result.nfev),
+        "cached": False,
+        "warm_start": cached is not None or initial_params is not None,
     }
 
 
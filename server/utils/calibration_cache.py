@@ -0,0 +1,139 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+CALIBRATION_CACHE_PATH = os.environ.get(
+    "CALIBRATION_CACHE_PATH", "calibration_cache.db"
+)
+# Entries older than this are evicted and never used, even as a warm start
+CALIBRATION_CACHE_MAX_AGE = float(
+    os.environ.get("CALIBRATION_CACHE_MAX_AGE", 3 * 24 * 3600)
+)
+
+PARAM_NAMES = ["kappa", "rho", "volvol", "theta", "var0"]
+
+
+class CalibrationCache:
+    """
+    SQLite store of the last calibration per (symbol, expiration).
+
+    Safe to share between threads, and between processes through the file.
+    """
+
+    def __init__(
+        self,
+        path: str = CALIBRATION_CACHE_PATH,
+        max_age: float = CALIBRATION_CACHE_MAX_AGE,
+        spot_tolerance: float = 0.0025,
+        rmse_tolerance: float = 0.05,
+    ):
+        self.path = path
+        self.max_age = max_age
+        # Reuse without re-optimizing when spot moved less than spot_tolerance
+        # (relative) and the cached fit is at most rmse_tolerance worse
+        self.spot_tolerance = spot_tolerance
+        self.rmse_tolerance = rmse_tolerance
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS calibrations (
+                    symbol TEXT NOT NULL,
+                    expiration TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    underlying_price REAL NOT NULL,
+                    rmse REAL NOT NULL,
+                    created REAL NOT NULL,
+                    PRIMARY KEY (symbol, expiration)
+                )
+                """)
+
+    def __getstate__(self):
+        # Sent to calibration worker processes; the lock is per process
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:  # commit or roll back
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, symbol: str, expiration: str) -> Optional[Dict[str, Any]]:
+        """Cached entry, or None when missing or older than max_age"""
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT params, underlying_price, rmse, created FROM calibrations"
+                " WHERE symbol = ? AND expiration = ?",
+                (symbol.upper(), expiration),
+            ).fetchone()
+        if row is None or time.time() - row[3] > self.max_age:
+            return None
+        return {
+            "params": json.loads(row[0]),
+            "underlying_price": row[1],
+            "rmse": row[2],
+            "created": row[3],
+        }
+
+    def put(
+        self,
+        symbol: str,
+        expiration: str,
+        params: Dict[str, float],
+        underlying_price: float,
+        rmse: float,
+    ):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO calibrations VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    symbol.upper(),
+                    expiration,
+                    json.dumps({p: float(params[p]) for p in PARAM_NAMES}),
+                    float(underlying_price),
+                    float(rmse),
+                    time.time(),
+                ),
+            )
+
+    def is_reusable(
+        self, entry: Dict[str, Any], underlying_price: float, rmse: float
+    ) -> bool:
+        """Whether a cached fit (with rmse on today's chain) can be returned as is"""
+        spot_move = abs(underlying_price / entry["underlying_price"] - 1)
+        return spot_move <= self.spot_tolerance and rmse <= entry["rmse"] * (
+            1 + self.rmse_tolerance
+        )
+
+    def evict_expired(self) -> int:
+        """Delete entries older than max_age, returning how many were removed"""
+        with self._lock, self._connect() as conn:
+            cursor = conn.execute(
+                "DELETE FROM calibrations WHERE created < ?",
+                (time.time() - self.max_age,),
+            )
+            return cursor.rowcount
+
+
+_default_cache = None
+
+
+def default_cache() -> CalibrationCache:
+    """Process-wide cache at CALIBRATION_CACHE_PATH, created on first use"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = CalibrationCache()
+        _default_cache.evict_expired()
+    return _default_cache
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Any
+
+from utils.metrics import absorb, call_with_metrics, profiling_requested
+
+# Pool sizes and backlog limits (running + queued tasks) for the API
+CPU_WORKERS = int(os.environ.get("CPU_WORKERS", os.cpu_count() or 1))
+CPU_MAX_PENDING = int(os.environ.get("CPU_MAX_PENDING", 4 * CPU_WORKERS))
+IO_WORKERS = int(os.environ.get("IO_WORKERS", 16))
+IO_MAX_PENDING = int(os.environ.get("IO_MAX_PENDING", 8 * IO_WORKERS))
+
+
+class ExecutorOverloaded(Exception):
+    """Raised when a pool's backlog is full; the API answers 503"""
+
+
+class BoundedExecutor:
+    """
+    Lazily created executor that refuses new work once `max_pending` tasks are
+    running or queued, instead of letting the backlog grow without limit.
+    """
+
+    def __init__(
+        self, name: str, factory: Callable[[], Executor], workers: int, max_pending: int
+    ):
+        self.name = name
+        self.workers = workers
+        self.max_pending = max_pending
+        self._factory = factory
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    def available(self) -> int:
+        with self._lock:
+            return self.max_pending - self._pending
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise ExecutorOverloaded(f"{self.name} pool backlog is full")
+            if self._executor is None:
+                self._executor = self._factory()
+            self._pending += 1
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, fn, *args, **kwargs):
+        """Run fn on the pool without blocking the event loop"""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _init_worker():
+    """Spawned workers start without the API's logging configuration"""
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"))
+
+
+# CPU-bound pricing and calibration. Spawned (not forked) workers, since the
+# API process runs threads (I/O pool, chain downloads) when the pool starts.
+cpu_executor = BoundedExecutor(
+    "cpu",
+    lambda: ProcessPoolExecutor(
+        max_workers=CPU_WORKERS,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+    ),
+    CPU_WORKERS,
+    CPU_MAX_PENDING,
+)
+
+# Blocking network I/O (yfinance, FRED)
+io_executor = BoundedExecutor(
+    "io",
+    lambda: ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io"),
+    IO_WORKERS,
+    IO_MAX_PENDING,
+)
+
+
+async def run_cpu(fn, *args, **kwargs):
+    """Run fn on the process pool, collecting the worker's metrics (and profile)"""
+    result = await cpu_executor.run(
+        call_with_metrics, fn, args, kwargs, profiling_requested()
+    )
+    return absorb(result)
+
+
+async def run_io(fn, *args, **kwargs):
+    return await io_executor.run(fn, *args, **kwargs)
+
+
+def executor_stats() -> Dict[str, Any]:
+    return {"cpu": cpu_executor.stats(), "io": io_executor.stats()}
+
+
+def shutdown_executors():
+    cpu_executor.shutdown()
+    io_executor.shutdown()
@@ -1,16 +1,19 @@
-import yfinance as yf
+import logging
 import pandas as pd
 from typing import Dict, Any, List
 import numpy as np
 from datetime import datetime, timezone
 
+from utils.market_data import market_data
+from utils.metrics import timed
+
+logger = logging.getLogger(__name__)
+
 
 def get_market_data(symbol: str, total_results: int = 12) -> List[Dict[str, Any]]:
     try:
-        stock = yf.Ticker(symbol)
-        hist = stock.history(period="1d")
-        stock_price = hist["Close"].iloc[-1]
-        exp_dates = stock.options
+        stock_price = market_data.spot(symbol)
+        exp_dates = market_data.expirations(symbol)
 
         if not exp_dates:
             return {"error": "No expiration dates available"}
@@ -37,8 +40,9 @@ def get_market_data(symbol: str, total_results: int = 12) -> List[Dict[str, Any]
                     indices[-1] = len(exp_dates) - 1
 
             selected_exp_dates = [exp_dates[i] for i in indices]
-            print(
-                f"Selected expiration dates with maximum spacing: {selected_exp_dates}"
+            logger.debug(
+                "Selected expiration dates with maximum spacing: %s",
+                selected_exp_dates,
             )
         else:
             selected_exp_dates = exp_dates
@@ -51,15 +55,13 @@ def get_market_data(symbol: str, total_results: int = 12) -> List[Dict[str, Any]
 
         # Fetch all options data first
         all_options_data = {}
-        for exp_date in selected_exp_dates:
-            try:
-                option_chain = stock.option_chain(exp_date)
-                all_options_data[exp_date] = {
-                    "calls": option_chain.calls,
-                    "puts": option_chain.puts,
-                }
-            except Exception as e:
-                print(f"Error fetching options for {exp_date}: {str(e)}")
+        for exp_date, option_chain in market_data.chains(
+            symbol, selected_exp_dates
+        ).items():
+            all_options_data[exp_date] = {
+                "calls": option_chain.calls,
+                "puts": option_chain.puts,
+            }
 
         # Process calls - take the highest volume calls from each expiration date
         for exp_date, data in all_options_data.items():
@@ -185,7 +187,6 @@ def get_market_data(symbol: str, total_results: int = 12) -> List[Dict[str, Any]
         return {"error": str(e)}
 
 
-import yfinance as yf
 from math import exp
 import requests
 
@@ -212,6 +213,11 @@ def fetch_fred_rates():
     return rates
 
 
+def get_spot_price(symbol: str) -> float:
+    """Last close of the underlying"""
+    return market_data.spot(symbol)
+
+
 def get_rate_key(T):
     return (
         "1M"
@@ -223,8 +229,7 @@ def get_rate_key(T):
 def get_option_calibration_data(
     symbol, target_expiration_str, max_main=20, max_side=15, nside=4
 ):
-    tk = yf.Ticker(symbol)
-    expirations = pd.to_datetime(tk.options).date
+    expirations = pd.to_datetime(market_data.expirations(symbol)).date
     target_exp = pd.to_datetime(target_expiration_str).date()
     if target_exp not in expirations:
         raise ValueError("Target expiration not available.")
@@ -236,62 +241,69 @@ def get_option_calibration_data(
         if 0 <= i < len(expirations)
     ]
 
-    spot = tk.history(period="1d")["Close"].iloc[-1]
+    spot = market_data.spot(symbol)
     rates = fetch_fred_rates()
-    today = datetime.today().date()
+    today = market_data.as_of(symbol) or datetime.today().date()
     data = []
 
-    for expiry in selected_dates:
-        try:
-            df = tk.option_chain(expiry.isoformat()).calls
-            df = df.dropna(
-                subset=["bid", "ask", "impliedVolatility", "volume", "openInterest"]
-            )
-            df = df[(df.bid > 0) & (df.ask > 0)].copy()
-            df["midPrice"] = (df.bid + df.ask) / 2
-
-            T = (expiry - today).days / 365
-            rate = rates.get(get_rate_key(T), 0.0)
-            F = spot * exp(rate * T)
+    chains = market_data.chains(symbol, [d.isoformat() for d in selected_dates])
 
-            atm_strike = df.loc[(df.strike - F).abs().idxmin(), "strike"]
-            df["moneyness"] = (df.strike - atm_strike).abs()
-            n = max_main if expiry == target_exp else max_side
-
-            selected = df.nsmallest(n, "moneyness").copy()
-            selected["maturityDate"] = expiry
-            selected["maturity"] = T
-            selected["rate"] = rate
-            selected["forward"] = F
-            data.append(
-                selected[
-                    [
-                        "maturityDate",
-                        "maturity",
-                        "strike",
-                        "midPrice",
-                        "impliedVolatility",
-                        "forward",
-                        "rate",
+    with timed("filter"):
+        for expiry in selected_dates:
+            try:
+                df = chains[expiry.isoformat()].calls
+                df = df.dropna(
+                    subset=["bid", "ask", "impliedVolatility", "volume", "openInterest"]
+                )
+                df = df[(df.bid > 0) & (df.ask > 0)].copy()
+                df["midPrice"] = (df.bid + df.ask) / 2
+
+                T = (expiry - today).days / 365
+                rate = rates.get(get_rate_key(T), 0.0)
+                F = spot * exp(rate * T)
+
+                atm_strike = df.loc[(df.strike - F).abs().idxmin(), "strike"]
+                df["moneyness"] = (df.strike - atm_strike).abs()
+                n = max_main if expiry == target_exp else max_side
+
+                selected = df.nsmallest(n, "moneyness").copy()
+                selected["maturityDate"] = expiry
+                selected["maturity"] = T
+                selected["rate"] = rate
+                selected["forward"] = F
+                data.append(
+                    selected[
+                        [
+                            "maturityDate",
+                            "maturity",
+                            "strike",
+                            "midPrice",
+                            "impliedVolatility",
+                            "forward",
+                            "rate",
+                        ]
                     ]
-                ]
-            )
-        except:
-            continue
+                )
+            except:
+                continue
 
-    return pd.concat(data).reset_index(drop=True) if data else pd.DataFrame()
+        return pd.concat(data).reset_index(drop=True) if data else pd.DataFrame()
 
 
 def get_data_withoutR(
-    symbol, target_expiration_str, spot, max_main=20, max_side=15, nside=4
+    symbol, target_expiration_str, spot, max_main=20, max_side=15, nside=4, as_of=None
 ):
-    import yfinance as yf
+    """
+    Calls around `target_expiration_str` for calibration. Maturities are
+    counted from `as_of` (a date; by default the snapshot date when market
+    data is replayed from a SnapshotStore, today otherwise), so stored
+    snapshots are priced as of the day they were taken.
+    """
     import pandas as pd
     import numpy as np
     from datetime import datetime
 
-    tk = yf.Ticker(symbol)
-    expiration_dates = pd.to_datetime(tk.options).date
+    expiration_dates = pd.to_datetime(market_data.expirations(symbol)).date
     target_exp = pd.to_datetime(target_expiration_str).date()
 
     if target_exp not in expiration_dates:
@@ -301,44 +313,54 @@ def get_data_withoutR(
     indices = range(max(0, idx - nside - 1), min(len(expiration_dates), idx + nside))
     selected_dates = [expiration_dates[i] for i in indices]
 
-    today = datetime.today().date()
+    today = as_of or market_data.as_of(symbol) or datetime.today().date()
     result_frames = []
 
-    for expiry in selected_dates:
-        try:
-            calls = tk.option_chain(expiry.isoformat()).calls
-        except Exception:
-            continue
+    chains = market_data.chains(symbol, [d.isoformat() for d in selected_dates])
 
-        # Drop NA and filter positive bid/ask
-        calls = calls.dropna(
-            subset=["bid", "ask", "impliedVolatility", "volume", "openInterest"]
-        )
-        calls = calls[(calls.bid > 0) & (calls.ask > 0)]
-        if calls.empty:
-            continue
+    with timed("filter"):
+        for expiry in selected_dates:
+            if expiry.isoformat() not in chains:
+                continue
+            calls = chains[expiry.isoformat()].calls
 
-        calls["midPrice"] = (calls.bid + calls.ask) * 0.5
-        T = (expiry - today).days / 365
+            # Drop NA and filter positive bid/ask
+            calls = calls.dropna(
+                subset=["bid", "ask", "impliedVolatility", "volume", "openInterest"]
+            )
+            calls = calls[(calls.bid > 0) & (calls.ask > 0)]
+            if calls.empty:
+                continue
 
-        # Use numpy for faster min-abs-strike diff
-        strike_diff = np.abs(calls.strike.values - spot)
-        atm_idx = np.argmin(strike_diff)
-        atm_strike = calls.strike.values[atm_idx]
+            calls["midPrice"] = (calls.bid + calls.ask) * 0.5
+            T = (expiry - today).days / 365
 
-        calls["moneyness"] = np.abs(calls.strike.values - atm_strike)
-        n = max_main if expiry == target_exp else max_side
+            # Use numpy for faster min-abs-strike diff
+            strike_diff = np.abs(calls.strike.values - spot)
+            atm_idx = np.argmin(strike_diff)
+            atm_strike = calls.strike.values[atm_idx]
 
-        selected = calls.nsmallest(n, "moneyness").copy()
-        selected["maturityDate"] = expiry
-        selected["maturity"] = T
+            calls["moneyness"] = np.abs(calls.strike.values - atm_strike)
+            n = max_main if expiry == target_exp else max_side
 
-        result_frames.append(
-            selected[
-                ["maturityDate", "maturity", "strike", "midPrice", "impliedVolatility"]
-            ]
-        )
+            selected = calls.nsmallest(n, "moneyness").copy()
+            selected["maturityDate"] = expiry
+            selected["maturity"] = T
 
-    return (
-        pd.concat(result_frames, ignore_index=True) if result_frames else pd.DataFrame()
-    )
+            result_frames.append(
+                selected[
+                    [
+                        "maturityDate",
+                        "maturity",
+                        "strike",
+                        "midPrice",
+                        "impliedVolatility",
+                    ]
+                ]
+            )
+
+        return (
+            pd.concat(result_frames, ignore_index=True)
+            if result_frames
+            else pd.DataFrame()
+        )
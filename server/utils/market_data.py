@@ -0,0 +1,317 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, NamedTuple, Optional, Tuple
+
+import pandas as pd
+import requests
+import yfinance as yf
+
+from utils.metrics import timed
+
+logger = logging.getLogger(__name__)
+
+# Seconds each kind of market data stays fresh
+MARKET_DATA_TTL = {
+    "spot": float(os.environ.get("MARKET_DATA_SPOT_TTL", 15)),
+    "expirations": float(os.environ.get("MARKET_DATA_EXPIRATIONS_TTL", 3600)),
+    "chain": float(os.environ.get("MARKET_DATA_CHAIN_TTL", 60)),
+}
+MARKET_DATA_CACHE_SIZE = int(os.environ.get("MARKET_DATA_CACHE_SIZE", 512))
+
+# Concurrent option-chain downloads
+CHAIN_FETCH_WORKERS = int(os.environ.get("CHAIN_FETCH_WORKERS", 8))
+CHAIN_FETCH_TIMEOUT = float(os.environ.get("CHAIN_FETCH_TIMEOUT", 20))
+CHAIN_FETCH_RETRIES = int(os.environ.get("CHAIN_FETCH_RETRIES", 2))
+CHAIN_FETCH_BACKOFF = float(os.environ.get("CHAIN_FETCH_BACKOFF", 0.5))
+
+
+class OptionChain(NamedTuple):
+    calls: pd.DataFrame
+    puts: pd.DataFrame
+
+
+class YFinanceProvider:
+    """Live market data from Yahoo Finance"""
+
+    def spot(self, symbol: str) -> float:
+        return float(yf.Ticker(symbol).history(period="1d")["Close"].iloc[-1])
+
+    def expirations(self, symbol: str) -> Tuple[str, ...]:
+        return tuple(yf.Ticker(symbol).options)
+
+    def chain(self, symbol: str, expiry: str) -> OptionChain:
+        chain = yf.Ticker(symbol).option_chain(expiry)
+        return OptionChain(chain.calls, chain.puts)
+
+
+class FixtureProvider:
+    """
+    Market data read from a local directory, for tests and offline runs:
+
+        <root>/<SYMBOL>/quote.json          {"spot": ..., "expirations": [...]}
+        <root>/<SYMBOL>/<expiry>_calls.csv  yfinance option_chain columns
+        <root>/<SYMBOL>/<expiry>_puts.csv
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _quote(self, symbol: str) -> Dict[str, Any]:
+        with open(os.path.join(self.root, symbol.upper(), "quote.json")) as f:
+            return json.load(f)
+
+    def spot(self, symbol: str) -> float:
+        return float(self._quote(symbol)["spot"])
+
+    def expirations(self, symbol: str) -> Tuple[str, ...]:
+        return tuple(self._quote(symbol)["expirations"])
+
+    def chain(self, symbol: str, expiry: str) -> OptionChain:
+        base = os.path.join(self.root, symbol.upper(), expiry)
+        return OptionChain(
+            pd.read_csv(f"{base}_calls.csv"), pd.read_csv(f"{base}_puts.csv")
+        )
+
+
+class HTTPProvider:
+    """
+    Market data from an HTTP service speaking the FixtureProvider layout as
+    JSON, e.g. the stub in utils.stub_market_server used for benchmarks:
+
+        GET <base_url>/<SYMBOL>/quote            {"spot": ..., "expirations": [...]}
+        GET <base_url>/<SYMBOL>/chain/<expiry>   {"calls": [...], "puts": [...]}
+    """
+
+    def __init__(self, base_url: str, timeout: float = CHAIN_FETCH_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self._session = requests.Session()
+
+    def _get(self, path: str):
+        response = self._session.get(f"{self.base_url}/{path}", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def spot(self, symbol: str) -> float:
+        return float(self._get(f"{symbol.upper()}/quote")["spot"])
+
+    def expirations(self, symbol: str) -> Tuple[str, ...]:
+        return tuple(self._get(f"{symbol.upper()}/quote")["expirations"])
+
+    def chain(self, symbol: str, expiry: str) -> OptionChain:
+        data = self._get(f"{symbol.upper()}/chain/{expiry}")
+        return OptionChain(pd.DataFrame(data["calls"]), pd.DataFrame(data["puts"]))
+
+
+def with_retries(fetch: Callable[[], Any], retries: int, backoff: float):
+    """Call fetch, retrying failures with jittered exponential backoff"""
+    for attempt in range(retries + 1):
+        try:
+            return fetch()
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * 2**attempt * (0.5 + random.random()))
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a per-entry TTL"""
+
+    def __init__(self, maxsize: int = MARKET_DATA_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires, value = entry
+            if time.monotonic() >= expires:
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key, value, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class MarketDataCache:
+    """
+    Shared front for a market-data provider: spot, expiration lists and option
+    chains are cached with their own TTLs, and concurrent callers asking for
+    the same key share a single in-flight fetch.
+    """
+
+    def __init__(
+        self,
+        provider,
+        ttl: Dict[str, float] = None,
+        maxsize: int = MARKET_DATA_CACHE_SIZE,
+    ):
+        self.provider = provider
+        self.ttl = dict(MARKET_DATA_TTL, **(ttl or {}))
+        self._cache = TTLCache(maxsize)
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _get_or_fetch(self, key, fetch: Callable[[], Any]):
+        with self._lock:
+            hit, value = self._cache.get(key)
+            if hit:
+                return value
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+
+        if not owner:
+            return future.result()
+
+        try:
+            with timed("fetch", source=key[0]):
+                value = fetch()
+            self._cache.set(key, value, self.ttl[key[0]])
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def spot(self, symbol: str) -> float:
+        symbol = symbol.upper()
+        return self._get_or_fetch(("spot", symbol), lambda: self.provider.spot(symbol))
+
+    def expirations(self, symbol: str) -> Tuple[str, ...]:
+        symbol = symbol.upper()
+        return self._get_or_fetch(
+            ("expirations", symbol), lambda: self.provider.expirations(symbol)
+        )
+
+    def as_of(self, symbol: str) -> Optional[date]:
+        """
+        The day the provider's data for `symbol` is from when it is not live
+        (a replayed snapshot), else None: maturities count from that day
+        """
+        snapshot_date = getattr(self.provider, "snapshot_date", None)
+        return snapshot_date(symbol.upper()) if snapshot_date is not None else None
+
+    def chain(self, symbol: str, expiry: str) -> OptionChain:
+        """Option chain for one expiry; callers get their own copy to modify"""
+        symbol = symbol.upper()
+        chain = self._get_or_fetch(
+            ("chain", symbol, expiry), lambda: self.provider.chain(symbol, expiry)
+        )
+        return OptionChain(chain.calls.copy(), chain.puts.copy())
+
+    def chains(
+        self,
+        symbol: str,
+        expiries: Iterable[str],
+        timeout: float = CHAIN_FETCH_TIMEOUT,
+        retries: int = CHAIN_FETCH_RETRIES,
+    ) -> Dict[str, OptionChain]:
+        """
+        Option chains for several expiries, fetched concurrently on a bounded
+        thread pool. Each expiry is retried on failure; expiries that still
+        fail, or are not done within `timeout` seconds of the call, are left
+        out (and reported), like the sequential loops this replaces.
+        """
+        expiries = list(expiries)
+        futures = {
+            expiry: _chain_pool.submit(
+                with_retries,
+                lambda expiry=expiry: self.chain(symbol, expiry),
+                retries,
+                CHAIN_FETCH_BACKOFF,
+            )
+            for expiry in expiries
+        }
+        wait(futures.values(), timeout=timeout)
+
+        chains = {}
+        for expiry in expiries:
+            future = futures[expiry]
+            if not future.done():
+                future.cancel()
+                logger.warning("Timed out fetching options for %s", expiry)
+            elif future.exception() is not None:
+                logger.warning(
+                    "Error fetching options for %s: %s", expiry, future.exception()
+                )
+            else:
+                chains[expiry] = future.result()
+        return chains
+
+    def clear(self):
+        self._cache.clear()
+
+
+# Shared by every MarketDataCache so concurrent requests stay bounded
+_chain_pool = ThreadPoolExecutor(
+    max_workers=CHAIN_FETCH_WORKERS, thread_name_prefix="chain-fetch"
+)
+
+
+def _default_provider():
+    """
+    MARKET_DATA_URL / MARKET_DATA_FIXTURES pick the source (yfinance
+    otherwise). With MARKET_DATA_SNAPSHOTS set, everything fetched is also
+    stored in that snapshot store, or, when MARKET_DATA_SNAPSHOT_DATE is set
+    too ("latest" or YYYY-MM-DD), served from it instead; maturities are
+    then counted from the snapshot's date (see MarketDataCache.as_of).
+    """
+    url = os.environ.get("MARKET_DATA_URL")
+    fixtures = os.environ.get("MARKET_DATA_FIXTURES")
+    snapshots = os.environ.get("MARKET_DATA_SNAPSHOTS")
+    snapshot_date = os.environ.get("MARKET_DATA_SNAPSHOT_DATE")
+    if snapshots:
+        from utils.snapshot_store import (
+            RecordingProvider,
+            SnapshotProvider,
+            SnapshotStore,
+        )
+
+        if snapshot_date:
+            as_of = None if snapshot_date == "latest" else snapshot_date
+            return SnapshotProvider(snapshots, as_of)
+    if url:
+        provider = HTTPProvider(url)
+    else:
+        provider = FixtureProvider(fixtures) if fixtures else YFinanceProvider()
+    return (
+        RecordingProvider(provider, SnapshotStore(snapshots)) if snapshots else provider
+    )
+
+
+# Process-wide cache used by utils.fetch_data
+market_data = MarketDataCache(_default_provider())
+
+
+def set_provider(provider):
+    """Swap the data source behind the shared cache (and drop cached data)"""
+    market_data.provider = provider
+    market_data.clear()
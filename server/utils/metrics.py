@@ -0,0 +1,363 @@
+"""
+Process-local histograms exported in the Prometheus text format, and
+sampled cProfile capture of slow requests.
+
+Work on the CPU pool runs in other processes, so run_cpu goes through
+call_with_metrics: the worker drains what it recorded during the call and
+sends it back with the result, and the API process merges it into its own
+registry. /metrics then covers every stage wherever it ran.
+
+Profiling is off unless PROFILE_SAMPLE_RATE > 0 (or it is switched on at
+runtime through set_profiling). A sampled request profiles the pool calls
+it makes, where its CPU time goes, and keeps the report when the request
+took at least PROFILE_MIN_SECONDS.
+"""
+
+import contextlib
+import contextvars
+import cProfile
+import io
+import os
+import pstats
+import random
+import threading
+import time
+import traceback
+from bisect import bisect_left
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List, NamedTuple, Optional
+
+# Seconds, from sub-millisecond quadrature to minute-long calibrations
+STAGE_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+ITERATION_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# name -> (help, buckets)
+METRICS = {
+    "options_stage_duration_seconds": (
+        "Time spent per processing stage",
+        STAGE_BUCKETS,
+    ),
+    "options_optimizer_iterations": (
+        "Optimizer iterations per calibration",
+        ITERATION_BUCKETS,
+    ),
+    "options_http_request_duration_seconds": (
+        "HTTP request latency by route",
+        STAGE_BUCKETS,
+    ),
+}
+STAGE_METRIC = "options_stage_duration_seconds"
+
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0.0))
+PROFILE_MIN_SECONDS = float(os.environ.get("PROFILE_MIN_SECONDS", 1.0))
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", 20))  # Most recent reports
+PROFILE_TOP = 40  # Functions per report, by cumulative time
+
+
+class Histogram:
+    """Prometheus-style histogram: per-bucket counts, sum and count"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, counts, total: float, count: int):
+        self.counts = [a + b for a, b in zip(self.counts, counts)]
+        self.sum += total
+        self.count += count
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(labels, extra: str = "") -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class MetricsRegistry:
+    """Thread-safe set of histograms keyed by metric name and labels"""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(METRICS[name][1])
+            histogram.observe(value)
+
+    def drain(self) -> List[tuple]:
+        """Everything recorded so far, as picklable tuples, and reset"""
+        with self._lock:
+            histograms, self._histograms = self._histograms, {}
+        return [(key, h.counts, h.sum, h.count) for key, h in histograms.items()]
+
+    def merge(self, snapshot: List[tuple]):
+        """Add a drain() from another process"""
+        with self._lock:
+            for key, counts, total, count in snapshot:
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = Histogram(METRICS[key[0]][1])
+                histogram.merge(counts, total, count)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            items = sorted(
+                (key, list(h.counts), h.sum, h.count, h.buckets)
+                for key, h in self._histograms.items()
+            )
+        lines = []
+        for name, (help_text, _) in METRICS.items():
+            series = [item for item in items if item[0][0] == name]
+            if not series:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for (_, labels), counts, total, count, buckets in series:
+                cumulative = 0
+                for bound, n in zip(buckets + ("+Inf",), counts):
+                    cumulative += n
+                    le = _label_text(labels, f'le="{bound}"')
+                    lines.append(f"{name}_bucket{le} {cumulative}")
+                lines.append(f"{name}_sum{_label_text(labels)} {total}")
+                lines.append(f"{name}_count{_label_text(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+# Per process; the API process also holds what its pool workers sent back
+registry = MetricsRegistry()
+
+
+def observe(name: str, value: float, **labels):
+    registry.observe(name, value, **labels)
+
+
+@contextlib.contextmanager
+def timed(stage: str, **labels):
+    """Record the duration of the block (or decorated function) for `stage`"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        registry.observe(
+            STAGE_METRIC, time.perf_counter() - start, stage=stage, **labels
+        )
+
+
+# --- Work shipped to the CPU pool ---
+
+
+class WorkerResult(NamedTuple):
+    value: Any
+    metrics: List[tuple]
+    profile: Optional[str]
+    error: Optional[BaseException] = None  # Raised by fn, re-raised by absorb
+    traceback: Optional[str] = None  # Of `error`, formatted in the worker
+
+
+class RemoteTraceback(Exception):
+    """Cause attached to an error re-raised from a pool worker"""
+
+    def __init__(self, traceback: str):
+        self.traceback = traceback
+
+    def __str__(self):
+        return self.traceback
+
+
+def _profile_report(profiler: cProfile.Profile) -> str:
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats("cumulative").print_stats(PROFILE_TOP)
+    return out.getvalue()
+
+
+def call_with_metrics(fn, args, kwargs, profile: bool = False) -> WorkerResult:
+    """
+    Run fn in a pool worker and return its result with the worker's metrics.
+    If fn raises, the exception comes back in the WorkerResult too, so the
+    timings and profile of a failing call are not lost.
+    """
+    profiler = cProfile.Profile() if profile else None
+    value = error = trace = None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        value = fn(*args, **kwargs)
+    except Exception as e:
+        error, trace = e, traceback.format_exc()
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        report = _profile_report(profiler) if profiler is not None else None
+        metrics = registry.drain()
+    return WorkerResult(value, metrics, report, error, trace)
+
+
+def absorb(result: WorkerResult):
+    """
+    Merge a WorkerResult's metrics and profile here and return its value,
+    or raise the error of the call
+    """
+    registry.merge(result.metrics)
+    reports = _request_profiles.get()
+    if result.profile is not None and reports is not None:
+        reports.append(result.profile)
+    if result.error is not None:
+        raise result.error from RemoteTraceback(result.traceback)
+    return result.value
+
+
+# --- Sampled profiling of slow requests ---
+
+_settings = {"sample_rate": PROFILE_SAMPLE_RATE, "min_seconds": PROFILE_MIN_SECONDS}
+_settings_lock = threading.Lock()
+# Pool profiles of the current request, when it was sampled
+_request_profiles = contextvars.ContextVar("request_profiles", default=None)
+_profiles = deque(maxlen=PROFILE_KEEP)
+
+
+def profiling_settings() -> Dict[str, float]:
+    with _settings_lock:
+        return dict(_settings)
+
+
+def set_profiling(
+    sample_rate: Optional[float] = None, min_seconds: Optional[float] = None
+) -> Dict[str, float]:
+    """Change sampling at runtime (a rate of 0 switches profiling off)"""
+    if sample_rate is not None and not 0 <= sample_rate <= 1:
+        raise ValueError("sample_rate must be between 0 and 1")
+    if min_seconds is not None and min_seconds < 0:
+        raise ValueError("min_seconds must be non-negative")
+    with _settings_lock:
+        if sample_rate is not None:
+            _settings["sample_rate"] = sample_rate
+        if min_seconds is not None:
+            _settings["min_seconds"] = min_seconds
+        return dict(_settings)
+
+
+def profiling_requested() -> bool:
+    """Whether pool calls made now belong to a sampled request"""
+    return _request_profiles.get() is not None
+
+
+@contextlib.contextmanager
+def sampled_request(method: str, path: str):
+    """
+    Decide whether this request is profiled; on exit, keep the pool
+    profiles it collected if it was slow enough
+    """
+    settings = profiling_settings()
+    if random.random() >= settings["sample_rate"]:
+        yield
+        return
+
+    reports = []
+    token = _request_profiles.set(reports)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _request_profiles.reset(token)
+        elapsed = time.perf_counter() - start
+        if elapsed >= settings["min_seconds"]:
+            _profiles.append(
+                {
+                    "method": method,
+                    "path": path,
+                    "duration": round(elapsed, 6),
+                    "timestamp": datetime.now(timezone.utc).isoformat(
+                        timespec="seconds"
+                    ),
+                    "profiles": reports,
+                }
+            )
+
+
+def recent_profiles() -> List[Dict[str, Any]]:
+    """Kept reports, newest first"""
+    return list(reversed(_profiles))
+
+
+class RequestMetrics:
+    """
+    ASGI middleware recording request latency by route template (which
+    keeps /market-data/{symbol} one series) and running sampled_request
+    around each request. Routes mounted under `prefix` get it prepended.
+    """
+
+    def __init__(self, app, prefix: str = ""):
+        self.app = app
+        self.prefix = prefix
+
+    def _route(self, scope) -> str:
+        route = scope.get("route")
+        if route is None:
+            return "unmatched"
+        path = route.path
+        if self.prefix and scope["path"].startswith(self.prefix):
+            if not path.startswith(self.prefix):
+                path = self.prefix + path
+        return path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500  # Unless the app gets to send a response
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            with sampled_request(scope["method"], scope["path"]):
+                await self.app(scope, receive, send_with_status)
+        finally:
+            registry.observe(
+                "options_http_request_duration_seconds",
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=self._route(scope),
+                status=status,
+            )
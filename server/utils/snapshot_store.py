@@ -0,0 +1,262 @@
+"""
+On-disk store of option-chain snapshots, so calibrations and backtests can
+be rerun from exactly the data they saw, without the network.
+
+Chains are Arrow IPC files partitioned by symbol, snapshot date and expiry,
+next to the quote (spot and listed expirations) of that date:
+
+    <root>/symbol=<SYMBOL>/date=<YYYY-MM-DD>/quote.json
+    <root>/symbol=<SYMBOL>/date=<YYYY-MM-DD>/expiry=<YYYY-MM-DD>.arrow
+
+Each chain file holds the calls, then the puts, of one expiry with
+yfinance's option_chain columns plus `option_type`; the number of calls is
+in the schema metadata so reads split the table with zero-copy slices.
+Files are written uncompressed so reads can memory-map them instead of
+copying them in.
+
+pyarrow is optional: only the store needs it.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import pandas as pd
+
+from utils.market_data import OptionChain
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+except ImportError:  # Only needed for snapshots
+    pa = None
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("The snapshot store needs pyarrow (pip install pyarrow)")
+
+
+def _day(value: Union[date, str, None]) -> str:
+    if value is None:
+        return date.today().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return pd.Timestamp(value).date().isoformat()
+
+
+def _replace_atomically(path: str, write):
+    """write(tmp_path), then move it over `path` so readers never see half a file"""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class SnapshotStore:
+    """Read and write chain snapshots under `root` (layout in the module doc)"""
+
+    def __init__(self, root: str):
+        _require_pyarrow()
+        self.root = root
+        self._quote_lock = threading.Lock()
+
+    def _directory(self, symbol: str, as_of) -> str:
+        return os.path.join(
+            self.root, f"symbol={symbol.upper()}", f"date={_day(as_of)}"
+        )
+
+    def _chain_path(self, symbol: str, as_of, expiry: str) -> str:
+        return os.path.join(self._directory(symbol, as_of), f"expiry={expiry}.arrow")
+
+    # --- Writing ---
+
+    def write_chain(self, symbol: str, expiry: str, chain: OptionChain, as_of=None):
+        frames = [
+            frame.assign(option_type=option_type)
+            for option_type, frame in (("call", chain.calls), ("put", chain.puts))
+        ]
+        table = pa.Table.from_pandas(
+            pd.concat(frames, ignore_index=True), preserve_index=False
+        )
+        table = table.replace_schema_metadata(
+            {**table.schema.metadata, b"calls": str(len(chain.calls)).encode()}
+        )
+
+        def write(path):
+            with pa.OSFile(path, "wb") as sink:
+                with ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+
+        _replace_atomically(self._chain_path(symbol, as_of, expiry), write)
+
+    def write_quote(self, symbol: str, as_of=None, **fields):
+        """Merge `fields` (spot, expirations) into the date's quote.json"""
+        path = os.path.join(self._directory(symbol, as_of), "quote.json")
+        with self._quote_lock:
+            quote = self._read_json(path) or {}
+            quote.update(fields)
+
+            def write(tmp):
+                with open(tmp, "w") as f:
+                    json.dump(quote, f)
+
+            _replace_atomically(path, write)
+
+    # --- Reading ---
+
+    @staticmethod
+    def _read_json(path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def read_quote(self, symbol: str, as_of=None) -> Dict[str, Any]:
+        path = os.path.join(self._directory(symbol, as_of), "quote.json")
+        quote = self._read_json(path)
+        if quote is None:
+            raise FileNotFoundError(path)
+        return quote
+
+    def read_table(self, symbol: str, expiry: str, as_of=None) -> "pa.Table":
+        """One expiry's chain as an Arrow table backed by the memory-mapped file"""
+        source = pa.memory_map(self._chain_path(symbol, as_of, expiry), "r")
+        return ipc.open_file(source).read_all()
+
+    def read_chain(self, symbol: str, expiry: str, as_of=None) -> OptionChain:
+        table = self.read_table(symbol, expiry, as_of)
+        n_calls = int(table.schema.metadata[b"calls"])
+        table = table.drop_columns(["option_type"])
+        return OptionChain(
+            table.slice(0, n_calls).to_pandas(), table.slice(n_calls).to_pandas()
+        )
+
+    def symbols(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name.split("=", 1)[1]
+            for name in os.listdir(self.root)
+            if name.startswith("symbol=")
+        )
+
+    def dates(self, symbol: str) -> List[str]:
+        """Snapshot dates of `symbol` that have a quote, oldest first"""
+        directory = os.path.join(self.root, f"symbol={symbol.upper()}")
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            name.split("=", 1)[1]
+            for name in os.listdir(directory)
+            if name.startswith("date=")
+            and os.path.exists(os.path.join(directory, name, "quote.json"))
+        )
+
+    def expiries(self, symbol: str, as_of=None) -> List[str]:
+        """Expiries with a stored chain on that date"""
+        directory = self._directory(symbol, as_of)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(
+            name[len("expiry=") : -len(".arrow")]
+            for name in os.listdir(directory)
+            if name.startswith("expiry=") and name.endswith(".arrow")
+        )
+
+
+class RecordingProvider:
+    """
+    Wraps another market-data provider and stores everything it fetches in
+    a SnapshotStore, under the date of the fetch
+    """
+
+    def __init__(self, provider, store: SnapshotStore):
+        self.provider = provider
+        self.store = store
+
+    def spot(self, symbol: str) -> float:
+        spot = self.provider.spot(symbol)
+        self.store.write_quote(symbol, spot=spot)
+        return spot
+
+    def expirations(self, symbol: str) -> Tuple[str, ...]:
+        expirations = self.provider.expirations(symbol)
+        self.store.write_quote(symbol, expirations=list(expirations))
+        return expirations
+
+    def chain(self, symbol: str, expiry: str) -> OptionChain:
+        chain = self.provider.chain(symbol, expiry)
+        self.store.write_chain(symbol, expiry, chain)
+        return chain
+
+
+class SnapshotProvider:
+    """
+    Market data served from a SnapshotStore as of one snapshot date (the
+    latest one of each symbol when `as_of` is None); no network access
+    """
+
+    def __init__(self, store: Union[SnapshotStore, str], as_of=None):
+        self.store = store if isinstance(store, SnapshotStore) else SnapshotStore(store)
+        self.as_of = None if as_of is None else _day(as_of)
+
+    def _date(self, symbol: str) -> str:
+        if self.as_of is not None:
+            return self.as_of
+        dates = self.store.dates(symbol)
+        if not dates:
+            raise FileNotFoundError(f"No snapshots of {symbol.upper()}")
+        return dates[-1]
+
+    def snapshot_date(self, symbol: str) -> date:
+        """The day `symbol`'s data is served as of"""
+        return date.fromisoformat(self._date(symbol))
+
+    def spot(self, symbol: str) -> float:
+        return float(self.store.read_quote(symbol, self._date(symbol))["spot"])
+
+    def expirations(self, symbol: str) -> Tuple[str, ...]:
+        quote = self.store.read_quote(symbol, self._date(symbol))
+        return tuple(quote["expirations"])
+
+    def chain(self, symbol: str, expiry: str) -> OptionChain:
+        return self.store.read_chain(symbol, expiry, self._date(symbol))
+
+
+def snapshot_symbols(store: SnapshotStore, symbols, provider=None) -> Dict[str, int]:
+    """
+    Store today's spot, expirations and every listed chain of `symbols`
+    (from `provider`, yfinance by default). Returns the number of chains
+    stored per symbol.
+    """
+    from utils.market_data import MarketDataCache, YFinanceProvider
+
+    cache = MarketDataCache(RecordingProvider(provider or YFinanceProvider(), store))
+    stored = {}
+    for symbol in symbols:
+        cache.spot(symbol)
+        stored[symbol.upper()] = len(cache.chains(symbol, cache.expirations(symbol)))
+    return stored
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Snapshot today's option chains of some symbols"
+    )
+    parser.add_argument("--root", required=True, help="SnapshotStore directory")
+    parser.add_argument("symbols", nargs="+")
+    args = parser.parse_args()
+    print(snapshot_symbols(SnapshotStore(args.root), args.symbols))
@@ -0,0 +1,67 @@
+"""
+Local HTTP stand-in for the market-data provider, serving a FixtureProvider
+directory in the layout HTTPProvider expects. Used for benchmarks:
+
+    python -m utils.stub_market_server --root fixtures --port 8765 --latency 0.2
+    MARKET_DATA_URL=http://127.0.0.1:8765 uvicorn main:app
+"""
+
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.market_data import FixtureProvider
+
+
+def make_handler(provider: FixtureProvider, latency: float):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)  # Simulated round trip
+            parts = self.path.strip("/").split("/")
+            try:
+                if len(parts) == 2 and parts[1] == "quote":
+                    body = {
+                        "spot": provider.spot(parts[0]),
+                        "expirations": list(provider.expirations(parts[0])),
+                    }
+                elif len(parts) == 3 and parts[1] == "chain":
+                    chain = provider.chain(parts[0], parts[2])
+                    body = {
+                        "calls": chain.calls.to_dict(orient="records"),
+                        "puts": chain.puts.to_dict(orient="records"),
+                    }
+                else:
+                    self.send_error(404)
+                    return
+            except FileNotFoundError:
+                self.send_error(404)
+                return
+
+            payload = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def serve(root: str, port: int = 8765, latency: float = 0.0):
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", port), make_handler(FixtureProvider(root), latency)
+    )
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--root", required=True, help="FixtureProvider directory")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    args = parser.parse_args()
+    serve(args.root, args.port, args.latency)
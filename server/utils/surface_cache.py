@@ -0,0 +1,223 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+from scipy.interpolate import RectBivariateSpline
+
+from utils.calibrateHeston import heston_call_prices_vectorized
+
+# Grid: standardized log-moneyness z = ln(K / F) / sqrt(T) in [-Z, Z] and
+# maturities in [T_min, T_max], spaced evenly in sqrt(T)
+SURFACE_Z_RANGE = float(os.environ.get("SURFACE_Z_RANGE", 1.0))
+SURFACE_MIN_MATURITY = float(os.environ.get("SURFACE_MIN_MATURITY", 1 / 12))
+SURFACE_MAX_MATURITY = float(os.environ.get("SURFACE_MAX_MATURITY", 3.0))
+SURFACE_GRID = (41, 24)  # (z, maturity) nodes of the first attempt
+# Surfaces are only used while their validated error, per unit of spot,
+# stays below this; the grid is refined (nodes doubled) up to
+# SURFACE_MAX_REFINEMENTS times to get there
+SURFACE_TOLERANCE = float(os.environ.get("SURFACE_TOLERANCE", 1e-5))
+SURFACE_MAX_REFINEMENTS = 2
+# Safety factor between the largest error seen at the cell midpoints and the
+# stated bound (off-midpoint errors can be slightly larger)
+SURFACE_ERROR_MARGIN = 2.0
+SURFACE_CACHE_SIZE = int(os.environ.get("SURFACE_CACHE_SIZE", 32))
+
+SURFACE_PARAMS = ("kappa", "theta", "rho", "xi", "v0")
+
+
+def surface_key(params: Dict[str, Any]) -> Tuple[float, ...]:
+    """Heston parameters identifying a surface; any change is a new surface"""
+    return tuple(float(params[p]) for p in SURFACE_PARAMS)
+
+
+class HestonSurface:
+    """
+    Heston call prices precomputed for one parameter set and interpolated
+    with a bicubic spline.
+
+    Under Heston the undiscounted call price per unit of forward,
+    c = C e^{rT} / F, only depends on K / F and T, so one grid serves every
+    spot and rate. It is laid out in z = ln(K / F) / sqrt(T) and sqrt(T),
+    where c is smooth (the short-maturity kink at the money is stretched
+    out). The error bound on |C_interpolated - C| / S is SURFACE_ERROR_MARGIN
+    times the largest interpolation error found at the cell midpoints,
+    checked against the quadrature prices.
+
+    The quadrature's own truncation error grows at short maturities, so the
+    grid starts at SURFACE_MIN_MATURITY.
+    """
+
+    def __init__(self, key: Tuple[float, ...], z, s, prices, error_bound: float):
+        self.key = key
+        self.z_range = (z[0], z[-1])
+        self.s_range = (s[0], s[-1])
+        self.spline = RectBivariateSpline(z, s, prices)
+        self.error_bound = error_bound
+        self.nodes = prices.size
+
+    @staticmethod
+    def _forward_prices(key, z, s):
+        """c on the (z, s) grid from the quadrature pricer"""
+        kappa, theta, rho, xi, v0 = key
+        Z, S = np.meshgrid(z, s, indexing="ij")
+        prices = heston_call_prices_vectorized(
+            1.0,
+            np.exp(Z * S).ravel(),
+            (S**2).ravel(),
+            0.0,
+            kappa,
+            rho,
+            xi,
+            theta,
+            v0,
+            0.0,
+        )
+        return prices.reshape(Z.shape)
+
+    @staticmethod
+    def build(params: Dict[str, Any]) -> "HestonSurface":
+        """
+        Price the grid, refining it until the midpoint error is within
+        SURFACE_TOLERANCE (or the refinements run out; check error_bound)
+        """
+        key = surface_key(params)
+        n_z, n_s = SURFACE_GRID
+        for _ in range(SURFACE_MAX_REFINEMENTS + 1):
+            z = np.linspace(-SURFACE_Z_RANGE, SURFACE_Z_RANGE, n_z)
+            s = np.linspace(
+                np.sqrt(SURFACE_MIN_MATURITY), np.sqrt(SURFACE_MAX_MATURITY), n_s
+            )
+            prices = HestonSurface._forward_prices(key, z, s)
+
+            z_mid, s_mid = (z[1:] + z[:-1]) / 2, (s[1:] + s[:-1]) / 2
+            exact = HestonSurface._forward_prices(key, z_mid, s_mid)
+            spline = RectBivariateSpline(z, s, prices)
+            # c <= 1, so the error per unit of forward bounds it per unit of spot
+            error_bound = SURFACE_ERROR_MARGIN * float(
+                np.max(np.abs(spline(z_mid, s_mid) - exact))
+            )
+            if error_bound <= SURFACE_TOLERANCE:
+                break
+            n_z, n_s = 2 * n_z - 1, 2 * n_s - 1
+
+        return HestonSurface(key, z, s, prices, error_bound)
+
+    @property
+    def usable(self) -> bool:
+        return self.error_bound <= SURFACE_TOLERANCE
+
+    def quote(
+        self, option_type: str, S: float, K: float, T: float, r: float
+    ) -> Optional[Dict[str, Any]]:
+        """Interpolated price, or None when (K, T) is outside the grid"""
+        if T <= 0 or K <= 0 or S <= 0:
+            return None
+        forward = S * np.exp(r * T)
+        s = np.sqrt(T)
+        z = np.log(K / forward) / s
+        if not (
+            self.z_range[0] <= z <= self.z_range[1]
+            and self.s_range[0] <= s <= self.s_range[1]
+        ):
+            return None
+
+        discount = np.exp(-r * T)
+        call = discount * forward * max(float(self.spline.ev(z, s)), 0.0)
+        if option_type.lower() == "call":
+            price = call
+        elif option_type.lower() == "put":
+            price = call - S + K * discount
+        else:
+            raise ValueError("option_type must be 'call' or 'put'")
+        # e^{-rT} F = S: the bound carries over to C per unit of spot
+        return {"price": price, "error_bound": self.error_bound * S}
+
+
+class SurfaceCache:
+    """
+    In-process LRU of HestonSurfaces, keyed by their parameters.
+
+    Surfaces are built elsewhere (HestonSurface.build on the CPU pool) and
+    stored here, so quotes never leave the serving process. Storing a
+    surface for a symbol drops the one its previous calibration left.
+    """
+
+    def __init__(self, max_surfaces: int = SURFACE_CACHE_SIZE):
+        self.max_surfaces = max_surfaces
+        self._surfaces = OrderedDict()
+        self._by_symbol = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, params: Dict[str, Any]) -> Optional[HestonSurface]:
+        try:
+            key = surface_key(params)
+        except (KeyError, TypeError):
+            return None
+        with self._lock:
+            surface = self._surfaces.get(key)
+            if surface is not None:
+                self._surfaces.move_to_end(key)
+            return surface
+
+    def put(self, surface: HestonSurface, symbol: Optional[str] = None):
+        if not surface.usable:
+            return
+        with self._lock:
+            if symbol is not None:
+                previous = self._by_symbol.get(symbol.upper())
+                if previous is not None and previous != surface.key:
+                    # The parameters changed: the old surface is stale
+                    self._surfaces.pop(previous, None)
+                self._by_symbol[symbol.upper()] = surface.key
+            self._surfaces[surface.key] = surface
+            self._surfaces.move_to_end(surface.key)
+            while len(self._surfaces) > self.max_surfaces:
+                self._surfaces.popitem(last=False)
+
+    def quote(
+        self, option_type: str, S: float, K: float, T: float, r: float, **params
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Price from a cached surface, or None when there is no surface for
+        these parameters or the contract is outside its grid
+        """
+        start_time = time.perf_counter()
+        surface = self.get(params)
+        result = surface.quote(option_type, S, K, T, r) if surface else None
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        elapsed_time = time.perf_counter() - start_time
+        return {
+            **result,
+            "methodology": "Heston Characteristic Function (Interpolated Surface)",
+            "calculation_time": round(elapsed_time * 1000, 5),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "surfaces": len(self._surfaces),
+                "max_surfaces": self.max_surfaces,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_default_cache = None
+
+
+def default_surface_cache() -> SurfaceCache:
+    """Process-wide surface cache, created on first use"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = SurfaceCache()
+    return _default_cache